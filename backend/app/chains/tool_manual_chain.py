@@ -1,6 +1,104 @@
+import asyncio
+import re
+from typing import AsyncIterator, List
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from app.config import load_google_llm
+from app.config import load_google_llm, settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the prompts change so cached manuals from older prompts are not served
+MANUAL_PROMPT_VERSION = "1"
+
+# Canonical manual sections, in output order: (title, points to cover)
+MANUAL_SECTIONS = [
+    ("Tool Overview", [
+        "What is this tool?",
+        "What is it used for?",
+        "Key applications",
+    ]),
+    ("Key Features and Specifications", [
+        "Main features",
+        "Technical specifications (if available)",
+        "Different types or variations",
+    ]),
+    ("Safety Precautions", [
+        "Important safety warnings",
+        "Protective equipment needed",
+        "Common hazards to avoid",
+    ]),
+    ("Step-by-Step Usage Guide", [
+        "Pre-use preparation",
+        "Detailed operation instructions",
+        "Post-use procedures",
+    ]),
+    ("Tips and Best Practices", [
+        "Expert recommendations",
+        "Efficiency tips",
+        "Common techniques",
+    ]),
+    ("Common Mistakes to Avoid", [
+        "Frequent user errors",
+        "What NOT to do",
+        "Troubleshooting common issues",
+    ]),
+    ("Maintenance and Care", [
+        "Cleaning procedures",
+        "Storage recommendations",
+        "Maintenance schedule",
+        "When to replace parts",
+    ]),
+    ("Additional Resources", [
+        "Reference to video tutorials (if mentioned in research)",
+        "Further reading suggestions",
+    ]),
+    ("Critical Safety Recap", [
+        "Summary of most important safety warnings",
+        "Final reminders for safe operation",
+    ]),
+]
+
+# Section numbers generated together by one call in section-parallel mode
+SECTION_GROUPS = [[1, 2], [3, 4], [5, 6], [7, 8, 9]]
+
+# A section group shorter than this is treated as empty and retried
+MIN_SECTION_LENGTH = 40
+
+
+# Translations are done in chunks of whole sections up to this size, so no chunk
+# comes close to the translation LLM's output limit
+TRANSLATION_CHUNK_CHARS = 6000
+
+
+class ManualSectionError(Exception):
+    """A section group stayed empty after all retries, so the manual is incomplete"""
+
+
+def render_sections_outline(section_numbers: List[int] = None) -> str:
+    """Render the '## N. Title' outline for the given (1-based) sections, all by default"""
+    numbers = section_numbers or range(1, len(MANUAL_SECTIONS) + 1)
+    blocks = []
+    for number in numbers:
+        title, points = MANUAL_SECTIONS[number - 1]
+        bullets = "\n".join(f"- {point}" for point in points)
+        blocks.append(f"## {number}. {title}\n{bullets}\n")
+    return "\n".join(blocks)
+
+
+def split_for_translation(text: str, max_chars: int = TRANSLATION_CHUNK_CHARS) -> List[str]:
+    """Split Markdown into chunks of at most max_chars, at headings (or paragraphs for long sections)"""
+    chunks, current = [], ""
+    for section in re.split(r"(?m)^(?=#{1,3} )", text):
+        pieces = [section] if len(section) <= max_chars else re.split(r"(?<=\n\n)", section)
+        for piece in pieces:
+            if current and len(current) + len(piece) > max_chars:
+                chunks.append(current)
+                current = ""
+            current += piece
+    if current.strip():
+        chunks.append(current)
+    return chunks
 
 
 class ToolManualChain:
@@ -8,29 +106,12 @@ class ToolManualChain:
     
     def __init__(self):
         self.llm = load_google_llm()
+        self.translation_llm = load_google_llm(settings.translation_max_tokens)
         self.output_parser = StrOutputParser()
     
-    def generate_manual(
-        self,
-        tool_name: str,
-        research_context: str,
-        tool_description: str = None,
-        language: str = "en"
-    ) -> str:
-        """
-        Generate a comprehensive tool manual from research data
-        
-        Args:
-            tool_name: Name of the tool
-            research_context: Research data from Tavily
-            tool_description: Optional description from Google Vision
-            language: Output language
-            
-        Returns:
-            Comprehensive tool manual as string
-        """
-        
-        prompt_template = ChatPromptTemplate.from_messages([
+    def _manual_prompt(self) -> ChatPromptTemplate:
+        """Prompt used for the full 9-section manual"""
+        return ChatPromptTemplate.from_messages([
             ("system", """You are an expert technical writer specializing in tool manuals and user guides. 
 Your task is to create clear, comprehensive, and user-friendly manuals for tools based on research data.
 Always write in a professional yet accessible tone."""),
@@ -43,73 +124,240 @@ Research Information:
 
 Please create a detailed, well-structured manual that includes:
 
-## 1. Tool Overview
-- What is this tool?
-- What is it used for?
-- Key applications
-
-## 2. Key Features and Specifications
-- Main features
-- Technical specifications (if available)
-- Different types or variations
-
-## 3. Safety Precautions
-- Important safety warnings
-- Protective equipment needed
-- Common hazards to avoid
-
-## 4. Step-by-Step Usage Guide
-- Pre-use preparation
-- Detailed operation instructions
-- Post-use procedures
-
-## 5. Tips and Best Practices
-- Expert recommendations
-- Efficiency tips
-- Common techniques
-
-## 6. Common Mistakes to Avoid
-- Frequent user errors
-- What NOT to do
-- Troubleshooting common issues
-
-## 7. Maintenance and Care
-- Cleaning procedures
-- Storage recommendations
-- Maintenance schedule
-- When to replace parts
-
-## 8. Additional Resources
-- Reference to video tutorials (if mentioned in research)
-- Further reading suggestions
-
-## 9. Critical Safety Recap
-- Summary of most important safety warnings
-- Final reminders for safe operation
-
+{sections_outline}
 Format the manual with clear headings, bullet points, and numbered lists where appropriate.
 Write in {language} language.
 Be thorough but concise. Aim for a manual that is both informative and easy to follow.""")
         ])
-        
+
+    def _section_prompt(self) -> ChatPromptTemplate:
+        """Prompt used for one group of sections in section-parallel mode"""
+        return ChatPromptTemplate.from_messages([
+            ("system", """You are an expert technical writer specializing in tool manuals and user guides.
+Your task is to create clear, comprehensive, and user-friendly manuals for tools based on research data.
+Always write in a professional yet accessible tone."""),
+            ("human", """You are writing part of a user manual for the tool: {tool_name}
+
+{tool_description_section}
+
+Research Information:
+{research_context}
+
+Write ONLY the following sections, using exactly these numbered headings:
+
+{sections_outline}
+Do not add a title, an introduction, a conclusion or any other section.
+Format the sections with bullet points and numbered lists where appropriate.
+Write in {language} language.
+Be thorough but concise.""")
+        ])
+
+    def _translation_prompt(self) -> ChatPromptTemplate:
+        """Prompt used to translate a generated manual or summary"""
+        return ChatPromptTemplate.from_messages([
+            ("system", "You are a professional technical translator specializing in tool manuals and safety documentation."),
+            ("human", """Translate the following {content_type} about the tool {tool_name} into {language} language.
+
+Keep the Markdown structure exactly as it is: headings, numbering, bullet points and lists.
+Translate every safety warning faithfully and completely.
+Return only the translation, nothing else.
+
+{text}""")
+        ])
+
+    def _summary_prompt(self) -> ChatPromptTemplate:
+        """Prompt used for the 2-3 sentence summary"""
+        return ChatPromptTemplate.from_messages([
+            ("system", "You are a technical expert providing concise tool descriptions."),
+            ("human", """Based on this research about {tool_name}:
+
+{research_context}
+
+Provide a brief 2-3 sentence summary that explains:
+1. What this tool is
+2. What it's primarily used for
+
+Write in {language} language. Be concise and informative.""")
+        ])
+
+    @staticmethod
+    def _manual_inputs(
+        tool_name: str,
+        research_context: str,
+        tool_description: str = None,
+        language: str = "en"
+    ) -> dict:
+        """Build the prompt variables for the manual chain"""
         # Build tool description section if available
         tool_description_section = ""
         if tool_description:
             tool_description_section = f"Tool Description (from image recognition):\n{tool_description}\n"
-        
-        # Create the chain
-        chain = prompt_template | self.llm | self.output_parser
-        
-        # Generate the manual
-        manual = chain.invoke({
+
+        return {
             "tool_name": tool_name,
             "tool_description_section": tool_description_section,
             "research_context": research_context,
-            "language": language
-        })
+            "language": language,
+            "sections_outline": render_sections_outline()
+        }
+
+    def generate_manual(
+        self,
+        tool_name: str,
+        research_context: str,
+        tool_description: str = None,
+        language: str = "en"
+    ) -> str:
+        """
+        Generate a comprehensive tool manual from research data
         
-        return manual
-    
+        Args:
+            tool_name: Name of the tool
+            research_context: Research data from Tavily
+            tool_description: Optional description from Google Vision
+            language: Output language
+            
+        Returns:
+            Comprehensive tool manual as string
+        """
+        chain = self._manual_prompt() | self.llm | self.output_parser
+        return chain.invoke(
+            self._manual_inputs(tool_name, research_context, tool_description, language)
+        )
+
+    async def agenerate_manual(
+        self,
+        tool_name: str,
+        research_context: str,
+        tool_description: str = None,
+        language: str = "en"
+    ) -> str:
+        """
+        Async variant of generate_manual. Does not block the event loop,
+        so it can run concurrently with the summary generation.
+        """
+        chain = self._manual_prompt() | self.llm | self.output_parser
+        return await chain.ainvoke(
+            self._manual_inputs(tool_name, research_context, tool_description, language)
+        )
+
+    async def astream_manual(
+        self,
+        tool_name: str,
+        research_context: str,
+        tool_description: str = None,
+        language: str = "en"
+    ) -> AsyncIterator[str]:
+        """
+        Stream the manual as text chunks as soon as the LLM produces them.
+        Joining all chunks gives the same result as agenerate_manual.
+        """
+        chain = self._manual_prompt() | self.llm | self.output_parser
+        async for chunk in chain.astream(
+            self._manual_inputs(tool_name, research_context, tool_description, language)
+        ):
+            if chunk:
+                yield chunk
+
+    async def _agenerate_section_group(
+        self,
+        section_numbers: List[int],
+        inputs: dict,
+        max_retries: int = 1
+    ) -> str:
+        """
+        Generate one group of sections, retrying when the model returns (almost)
+        nothing. Raises ManualSectionError when every attempt came back empty.
+        """
+        chain = self._section_prompt() | self.llm | self.output_parser
+        group_inputs = {**inputs, "sections_outline": render_sections_outline(section_numbers)}
+
+        text = ""
+        for attempt in range(max_retries + 1):
+            try:
+                text = (await chain.ainvoke(group_inputs)).strip()
+            except Exception as e:
+                if attempt == max_retries:
+                    raise
+                logger.warning(f"Manual sections {section_numbers} failed, retrying: {e}")
+                continue
+            if len(text) >= MIN_SECTION_LENGTH:
+                return text
+            logger.warning(f"Manual sections {section_numbers} came back empty (attempt {attempt + 1})")
+
+        # A manual missing sections (possibly Safety Precautions) must not be
+        # served, cached or stored as if it were complete
+        raise ManualSectionError(
+            f"Manual sections {section_numbers} could not be generated after {max_retries + 1} attempts"
+        )
+
+    async def astream_manual_sections(
+        self,
+        tool_name: str,
+        research_context: str,
+        tool_description: str = None,
+        language: str = "en"
+    ) -> AsyncIterator[str]:
+        """
+        Section-parallel manual generation.
+
+        Every group in SECTION_GROUPS is generated by its own LLM call, all sharing
+        the same research context. Groups are yielded in canonical order as soon as
+        each one (and every group before it) is ready, so the merged output is
+        deterministic and each call has the full max_tokens budget. A group that
+        can't be generated raises ManualSectionError instead of leaving a gap.
+        """
+        inputs = self._manual_inputs(tool_name, research_context, tool_description, language)
+        tasks = [
+            asyncio.create_task(self._agenerate_section_group(group, inputs))
+            for group in SECTION_GROUPS
+        ]
+        try:
+            for index, task in enumerate(tasks):
+                text = await task
+                yield text if index == 0 else "\n\n" + text
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def atranslate(
+        self,
+        text: str,
+        tool_name: str,
+        language: str,
+        content_type: str = "tool manual"
+    ) -> str:
+        """
+        Translate an already generated manual or summary into another language.
+        Much cheaper than regenerating from research, and keeps languages consistent.
+        Long texts (section-parallel manuals) are translated in chunks of whole
+        sections in parallel, so no single call runs into the output limit.
+
+        Args:
+            text: Manual or summary to translate
+            tool_name: Name of the tool
+            language: Target language
+            content_type: What the text is, e.g. "tool manual" or "tool summary"
+
+        Returns:
+            Translated text
+        """
+        chain = self._translation_prompt() | self.translation_llm | self.output_parser
+        parts = await asyncio.gather(*(
+            chain.ainvoke({
+                "text": chunk,
+                "tool_name": tool_name,
+                "language": language,
+                "content_type": content_type
+            })
+            for chunk in split_for_translation(text)
+        ))
+        # An empty part means the translation is incomplete, don't pass it off as whole
+        if not parts or any(not part or not part.strip() for part in parts):
+            return ""
+        return "\n\n".join(part.strip() for part in parts)
+
     def generate_quick_summary(
         self,
         tool_name: str,
@@ -127,29 +375,26 @@ Be thorough but concise. Aim for a manual that is both informative and easy to f
         Returns:
             Brief summary as string
         """
-        
-        prompt_template = ChatPromptTemplate.from_messages([
-            ("system", "You are a technical expert providing concise tool descriptions."),
-            ("human", """Based on this research about {tool_name}:
-
-{research_context}
-
-Provide a brief 2-3 sentence summary that explains:
-1. What this tool is
-2. What it's primarily used for
+        chain = self._summary_prompt() | self.llm | self.output_parser
+        return chain.invoke({
+            "tool_name": tool_name,
+            "research_context": research_context,
+            "language": language
+        })
 
-Write in {language} language. Be concise and informative.""")
-        ])
-        
-        chain = prompt_template | self.llm | self.output_parser
-        
-        summary = chain.invoke({
+    async def agenerate_quick_summary(
+        self,
+        tool_name: str,
+        research_context: str,
+        language: str = "en"
+    ) -> str:
+        """Async variant of generate_quick_summary."""
+        chain = self._summary_prompt() | self.llm | self.output_parser
+        return await chain.ainvoke({
             "tool_name": tool_name,
             "research_context": research_context,
             "language": language
         })
-        
-        return summary
 
 
 # Create singleton instance
@@ -43,15 +43,109 @@ class Settings:
     gemini_model: str = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
     temperature: float = float(os.getenv("TEMPERATURE", 0.7))
     max_tokens: int = int(os.getenv("MAX_TOKENS", 2048))
+    # Translations run longer than the English they come from
+    translation_max_tokens: int = int(os.getenv("TRANSLATION_MAX_TOKENS", 8192))
+
+    # Research context token budgets per prompt type
+    manual_context_tokens: int = int(os.getenv("MANUAL_CONTEXT_TOKENS", 6000))
+    summary_context_tokens: int = int(os.getenv("SUMMARY_CONTEXT_TOKENS", 1500))
+
+    # Generate manual section groups in parallel calls instead of one long call
+    manual_parallel_sections: bool = os.getenv("MANUAL_PARALLEL_SECTIONS", "false").lower() == "true"
 
     # File upload settings
     max_file_size: int = int(os.getenv("MAX_FILE_SIZE", 10 * 1024 * 1024))  # 10MB
 
+    # Vision preprocessing: long-edge limit (px), output format (jpeg | webp) and quality
+    vision_max_edge: int = int(os.getenv("VISION_MAX_EDGE", 1536))
+    vision_image_format: str = os.getenv("VISION_IMAGE_FORMAT", "jpeg")
+    vision_image_quality: int = int(os.getenv("VISION_IMAGE_QUALITY", 85))
+    # Tool names the model is less sure of are treated as "no tool"
+    vision_min_confidence: float = float(os.getenv("VISION_MIN_CONFIDENCE", 0.4))
+    # Multi-tool mode: tools kept from one image, and manual pipelines run at once
+    multi_tool_max_tools: int = int(os.getenv("MULTI_TOOL_MAX_TOOLS", 6))
+    multi_tool_concurrency: int = int(os.getenv("MULTI_TOOL_CONCURRENCY", 3))
+    # Background image uploads: attempts per request (backoff doubles from the
+    # retry delay), then the outbox retries every drain interval
+    image_upload_attempts: int = int(os.getenv("IMAGE_UPLOAD_ATTEMPTS", 3))
+    image_upload_retry_seconds: float = float(os.getenv("IMAGE_UPLOAD_RETRY_SECONDS", 1))
+    image_upload_drain_seconds: int = int(os.getenv("IMAGE_UPLOAD_DRAIN_SECONDS", 300))
+    # Recognition cache: entries, TTL (seconds) and max Hamming distance (of 64 bits) for a match
+    recognition_cache_size: int = int(os.getenv("RECOGNITION_CACHE_SIZE", 2048))
+    recognition_cache_ttl: int = int(os.getenv("RECOGNITION_CACHE_TTL", 7 * 24 * 3600))
+    recognition_hash_distance: int = int(os.getenv("RECOGNITION_HASH_DISTANCE", 6))
+
+    # Research fan-out: per-call timeouts (seconds) and concurrent transcript fetches
+    research_search_timeout: float = float(os.getenv("RESEARCH_SEARCH_TIMEOUT", 20))
+    transcript_timeout: float = float(os.getenv("TRANSCRIPT_TIMEOUT", 10))
+    # Pooled research HTTP client: max open connections, idle keep-alive and connect timeout (seconds)
+    research_http_max_connections: int = int(os.getenv("RESEARCH_HTTP_MAX_CONNECTIONS", 20))
+    research_http_keepalive: float = float(os.getenv("RESEARCH_HTTP_KEEPALIVE", 30))
+    research_http_connect_timeout: float = float(os.getenv("RESEARCH_HTTP_CONNECT_TIMEOUT", 5))
+    transcript_concurrency: int = int(os.getenv("TRANSCRIPT_CONCURRENCY", 4))
+    # Characters of relevant transcript excerpts kept per video
+    transcript_char_budget: int = int(os.getenv("TRANSCRIPT_CHAR_BUDGET", 2500))
+    # Research results at least this similar (estimated Jaccard) are collapsed into one
+    research_dedup_threshold: float = float(os.getenv("RESEARCH_DEDUP_THRESHOLD", 0.7))
+
+    # Cache settings
+    cache_dir: str = os.getenv("CACHE_DIR", ".cache")
+    manual_cache_size: int = int(os.getenv("MANUAL_CACHE_SIZE", 256))
+    manual_cache_ttl: int = int(os.getenv("MANUAL_CACHE_TTL", 7 * 24 * 3600))  # 7 days
+    research_cache_size: int = int(os.getenv("RESEARCH_CACHE_SIZE", 512))
+    research_cache_ttl: int = int(os.getenv("RESEARCH_CACHE_TTL", 24 * 3600))  # 1 day
+    tts_cache_size: int = int(os.getenv("TTS_CACHE_SIZE", 1024))
+    tts_cache_ttl: int = int(os.getenv("TTS_CACHE_TTL", 30 * 24 * 3600))  # 30 days
+    # Past the TTL, serve stale research for this long while refreshing in the background
+    research_cache_stale_ttl: int = int(os.getenv("RESEARCH_CACHE_STALE_TTL", 6 * 24 * 3600))
+    transcript_store_max_mb: int = int(os.getenv("TRANSCRIPT_STORE_MAX_MB", 200))
+    # Videos without a transcript are not retried for this long
+    transcript_negative_ttl: int = int(os.getenv("TRANSCRIPT_NEGATIVE_TTL", 7 * 24 * 3600))
+
+    # Tool-name canonicalization: trigram Jaccard a candidate needs before the
+    # typo check (which decides whether two names fold), alias table refresh
+    tool_alias_similarity: float = float(os.getenv("TOOL_ALIAS_SIMILARITY", 0.5))
+    tool_alias_refresh_seconds: int = int(os.getenv("TOOL_ALIAS_REFRESH_SECONDS", 3600))
+    tool_alias_scan_sample: int = int(os.getenv("TOOL_ALIAS_SCAN_SAMPLE", 5000))
+
+    # Local knowledge index: passages retrieved per request, and what counts as good enough
+    # local recall (passages found, share of query terms covered) to skip the web search
+    knowledge_chat_passages: int = int(os.getenv("KNOWLEDGE_CHAT_PASSAGES", 3))
+    knowledge_manual_passages: int = int(os.getenv("KNOWLEDGE_MANUAL_PASSAGES", 12))
+    knowledge_manual_min_passages: int = int(os.getenv("KNOWLEDGE_MANUAL_MIN_PASSAGES", 8))
+    knowledge_min_coverage: float = float(os.getenv("KNOWLEDGE_MIN_COVERAGE", 0.6))
+    knowledge_sync_seconds: int = int(os.getenv("KNOWLEDGE_SYNC_SECONDS", 600))
+    # Passages kept in the index (memory and disk), the oldest are dropped first
+    knowledge_max_passages: int = int(os.getenv("KNOWLEDGE_MAX_PASSAGES", 50000))
+
+    # Background manual jobs
+    manual_job_store: str = os.getenv("MANUAL_JOB_STORE", "memory")  # memory | sqlite
+    manual_job_concurrency: int = int(os.getenv("MANUAL_JOB_CONCURRENCY", 4))
+    # Jobs waiting for a slot; each holds its uploaded image in memory until it runs
+    manual_job_max_queued: int = int(os.getenv("MANUAL_JOB_MAX_QUEUED", 32))
+
+    # Batch manual pre-generation
+    pregenerate_languages: str = os.getenv("PREGENERATE_LANGUAGES", "en,fr,pdg")
+    pregenerate_top_n: int = int(os.getenv("PREGENERATE_TOP_N", 50))
+    pregenerate_rpm_per_key: float = float(os.getenv("PREGENERATE_RPM_PER_KEY", 10))
+
+    # Comma-separated Clerk user IDs allowed to call /api/admin endpoints
+    admin_user_ids: str = os.getenv("ADMIN_USER_IDS", "")
+
     @property
     def cors_origins_list(self):
         """Convert comma-separated CORS origins to list"""
         return [origin.strip() for origin in self.cors_origins.split(",")]
     
+    @property
+    def pregenerate_languages_list(self):
+        """Languages generated by the batch pre-generation"""
+        return [lang.strip() for lang in self.pregenerate_languages.split(",") if lang.strip()]
+
+    @property
+    def admin_user_ids_list(self):
+        return [user_id.strip() for user_id in self.admin_user_ids.split(",") if user_id.strip()]
+
     @property
     def api_keys_list(self):
         """Returns a list of Google API keys."""
@@ -179,7 +273,7 @@ gemini_client = RotatableClient()
 
 
 @lru_cache()
-def load_google_llm():
+def load_google_llm(max_output_tokens: int = None):
     """
     Load Google Gemini LLM with LangChain
     Cached to avoid recreating on every request
@@ -188,7 +282,7 @@ def load_google_llm():
         model=settings.gemini_model,
         google_api_key=key_manager.get_current_key(),
         temperature=settings.temperature,
-        max_output_tokens=settings.max_tokens,
+        max_output_tokens=max_output_tokens or settings.max_tokens,
     )
 
 
@@ -1,7 +1,7 @@
 from fastapi import HTTPException, UploadFile, File, Depends, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Optional
-from app.config import supabase
+from app.config import settings, supabase
 from supabase import Client
 import jwt
 from jwt.algorithms import RSAAlgorithm
@@ -97,6 +97,18 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+async def get_admin_user(user = Depends(get_current_user)):
+    """
+    Dependency for admin-only endpoints.
+    The user's Clerk ID must be listed in ADMIN_USER_IDS.
+    """
+    if str(user.id) not in settings.admin_user_ids_list:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required",
+        )
+    return user
+
 async def get_user_supabase_client(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Client:
     """
     Creates a Supabase client authenticated with the user's token.
@@ -106,7 +118,6 @@ async def get_user_supabase_client(credentials: HTTPAuthorizationCredentials = D
     try:
         # Create a new client with the user's token
         # We use the ANON key + the user's Bearer token
-        from app.config import settings
         from supabase import create_client, ClientOptions
         
         print(f"DEBUG: Creating Supabase client for user with token (first 10 chars): {token[:10]}...")
@@ -1,4 +1,6 @@
+import asyncio
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 
 # Disable HTTP/2 to prevent StreamReset errors with httpx/Supabase
@@ -6,13 +8,35 @@ os.environ["HTTPX_NO_HTTP2"] = "1"
 
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
-from app.routes import manual, chat, auth, audio
+from app.routes import manual, manual_jobs, chat, auth, audio, admin
+from app.services.tavily_service import close_research_clients
+from app.services.tool_canonicalizer import tool_canonicalizer
+from app.services.knowledge_index import knowledge_index
+from app.services.image_uploads import image_uploads
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build the tool-name alias table from the scans history and keep it fresh
+    alias_refresh = asyncio.create_task(tool_canonicalizer.refresh_periodically())
+    # Pull new scans and manuals into the local knowledge index
+    knowledge_sync = asyncio.create_task(knowledge_index.sync_periodically())
+    # Retry image uploads left in the outbox
+    upload_drain = asyncio.create_task(image_uploads.drain_periodically())
+    yield
+    alias_refresh.cancel()
+    knowledge_sync.cancel()
+    upload_drain.cancel()
+    # Release the pooled research connections
+    await close_research_clients()
+
 
 # Create FastAPI app
 app = FastAPI(
     title="Toolify API",
     description="Tool identification and manual generation API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -26,8 +50,10 @@ app.add_middleware(
 
 # Register routers
 app.include_router(manual.router)
+app.include_router(manual_jobs.router)
 app.include_router(chat.router)
 app.include_router(audio.router)
+app.include_router(admin.router)
 # CRITICAL: Registers the authentication router
 app.include_router(auth.router)
 
@@ -39,6 +65,8 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "generate_manual": "/api/generate-manual",
+            "generate_manual_stream": "/api/generate-manual/stream",
+            "manual_jobs": "/api/manual-jobs",
             "chat": "/api/chat"
         }
     }
@@ -3,12 +3,22 @@ from typing import List, Optional
 from datetime import datetime
 
 
+class TranscriptExcerpt(BaseModel):
+    """Relevant window of a YouTube transcript"""
+    start: float
+    end: float
+    text: str
+    url: str = Field(..., description="Link to the video at the start of the excerpt")
+    score: float = Field(default=0.0, description="Relevance score of the excerpt")
+
+
 class YouTubeLink(BaseModel):
     """YouTube tutorial link"""
     title: str
     url: str
     content: str
     score: float = Field(default=0.0, description="Relevance score of the YouTube link")
+    excerpts: List[TranscriptExcerpt] = Field(default_factory=list, description="Transcript excerpts used as content")
 
 
 class ResearchResult(BaseModel):
@@ -34,18 +44,65 @@ class ManualGenerationRequest(BaseModel):
     tool_name: Optional[str] = Field(None, description="Name of the tool")
     tool_description: Optional[str] = Field(None, description="Optional description from Google Vision")
     language: str = Field(default="en", description="Language for the manual")
+    languages: Optional[List[str]] = Field(None, description="Several languages from one research pass; the first is the primary language")
     generate_audio: bool = Field(default=False, description="Whether to generate audio file")
 
 
+class ManualTranslation(BaseModel):
+    """Manual and summary in an additional language"""
+    language: str
+    manual: str
+    summary: str
+    cached: bool = False
+
+
 class ManualGenerationResponse(BaseModel):
     """Response model for manual generation"""
     tool_name: str
     manual: str
     summary: str
+    language: Optional[str] = None
+    translations: List[ManualTranslation] = Field(default_factory=list, description="The other requested languages")
     audio_files: Optional[dict] = None 
     # pdf_url removed - PDF generation moved to frontend
     timestamp: datetime
     session_id: Optional[str] = None
+    cached: bool = Field(default=False, description="Whether the manual was served from the manual cache")
+
+
+class BatchManualItem(BaseModel):
+    """Manual for one of several tools detected in an image"""
+    tool_name: str
+    box: Optional[List[float]] = Field(None, description="Bounding box as [ymin, xmin, ymax, xmax], normalized to 0-1000")
+    result: Optional[ManualGenerationResponse] = None
+    error: Optional[str] = None
+
+
+class BatchManualGenerationResponse(BaseModel):
+    """Response model for multi-tool manual generation"""
+    description: str = ""
+    tools: List[BatchManualItem]
+    timestamp: datetime
+
+
+class ManualJobStage(BaseModel):
+    """A completed stage of a background manual job"""
+    stage: str
+    data: dict
+    completed_at: datetime
+
+
+class ManualJobResponse(BaseModel):
+    """Status of a background manual generation job"""
+    job_id: str
+    status: str = Field(description="queued, running, completed, failed or cancelled")
+    current_stage: Optional[str] = None
+    progress: float = Field(default=0.0, description="Fraction of pipeline stages completed (0-1)")
+    stages: List[ManualJobStage] = []
+    result: Optional[ManualGenerationResponse] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
 
 
 class ChatResponse(BaseModel):
@@ -57,6 +114,26 @@ class ChatResponse(BaseModel):
     user_message: Optional[str] = None  # Transcribed user message for voice inputs
 
 
+class ImageAnalysis(BaseModel):
+    """Structured result of the combined vision call"""
+    tool_name: Optional[str] = Field(None, description="Most specific name and type of the tool closest to the camera, or null if there is no tool.")
+    confidence: float = Field(0.0, description="Confidence between 0 and 1 that tool_name is correct.")
+    description: str = Field("", description="Concise description of what the image shows.")
+
+
+class DetectedTool(BaseModel):
+    """One tool found by multi-tool detection"""
+    name: str = Field(description="Most specific name and type of the tool.")
+    confidence: float = Field(0.0, description="Confidence between 0 and 1 that name is correct.")
+    box: Optional[List[float]] = Field(None, description="Bounding box as [ymin, xmin, ymax, xmax], normalized to 0-1000.")
+
+
+class ImageToolDetection(BaseModel):
+    """Structured result of the multi-tool vision call"""
+    tools: List[DetectedTool] = Field(default_factory=list, description="Every distinct tool in the image, most prominent first.")
+    description: str = Field("", description="Concise description of what the image shows.")
+
+
 class LLMStructuredOutput(BaseModel):
     """Structured output from LLM for language-aware responses"""
     language: str = Field(description="The language of the response, chosen from en, fr, or pdg.")
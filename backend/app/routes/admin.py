@@ -0,0 +1,81 @@
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Form, status
+from app.dependencies import get_admin_user
+from app.services.manual_cache import manual_cache
+from app.services.research_cache import research_cache
+from app.services.transcript_store import transcript_store
+from app.services.single_flight import research_flight, recognition_flight, manual_flight, tts_flight
+from app.services.tool_canonicalizer import tool_canonicalizer
+from app.services.knowledge_index import knowledge_index
+from app.services.image_preprocessing import image_preprocessor
+from app.services.recognition_cache import recognition_cache
+from app.services.image_uploads import image_uploads
+from app.services.content_store import content_store
+from app.services.tts_cache import tts_cache
+from app.services.manual_pregeneration import pregenerate_manuals, pregeneration_status
+import logging
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/admin", tags=["Admin"])
+
+# Keep a reference so the background run is not garbage collected
+_pregeneration_task: Optional[asyncio.Task] = None
+
+
+@router.post("/pregenerate-manuals", status_code=status.HTTP_202_ACCEPTED)
+async def start_manual_pregeneration(
+    tools: Optional[str] = Form(None),
+    top_n: Optional[int] = Form(None),
+    languages: Optional[str] = Form(None),
+    force: bool = Form(False),
+    user: dict = Depends(get_admin_user)
+):
+    """
+    Start pre-generating manuals in the background.
+    Uses the comma-separated `tools` list if given, otherwise the top_n most-scanned tools.
+    """
+    global _pregeneration_task
+
+    if pregeneration_status["running"] or (_pregeneration_task and not _pregeneration_task.done()):
+        raise HTTPException(status_code=409, detail="Manual pre-generation is already running")
+
+    _pregeneration_task = asyncio.create_task(pregenerate_manuals(
+        tool_names=[t.strip() for t in tools.split(",") if t.strip()] if tools else None,
+        top_n=top_n,
+        languages=[l.strip() for l in languages.split(",") if l.strip()] if languages else None,
+        force=force
+    ))
+    logger.info(f"Manual pre-generation started by {user.id}")
+    return {"message": "Manual pre-generation started"}
+
+
+@router.get("/pregenerate-manuals")
+async def get_manual_pregeneration_status(user: dict = Depends(get_admin_user)):
+    """Report whether pre-generation is running and what the last run produced"""
+    return pregeneration_status
+
+
+@router.get("/cache-stats")
+async def get_cache_stats(user: dict = Depends(get_admin_user)):
+    """Hit/miss counters of the service caches, and how many calls were coalesced"""
+    return {
+        "manual": manual_cache.stats(),
+        "research": research_cache.stats(),
+        "transcripts": transcript_store.stats(),
+        "tool_names": tool_canonicalizer.stats(),
+        "knowledge": knowledge_index.stats(),
+        "image_preprocessing": image_preprocessor.stats(),
+        "recognition": recognition_cache.stats(),
+        "image_uploads": image_uploads.stats(),
+        "content_store": content_store.stats(),
+        "tts": tts_cache.stats(),
+        "coalescing": {
+            "research": research_flight.stats(),
+            "recognition": recognition_flight.stats(),
+            "manual": manual_flight.stats(),
+            "tts": tts_flight.stats()
+        }
+    }
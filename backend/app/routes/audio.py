@@ -16,12 +16,8 @@ async def generate_tts(
 ):
     """Generate text-to-speech audio for a message"""
     try:
-        # Generate audio using YarnGPT via audio_service
-        audio_url = audio_service.generate_audio(
-            text=text,
-            tool_name="chat_message",
-            user_id=str(user.id)
-        )
+        # Generate audio using YarnGPT via audio_service (cached per text and voice)
+        audio_url = await audio_service.agenerate_audio(text=text)
         
         # If message_id is provided, save the audio URL to the message history
         if message_id:
@@ -1,15 +1,17 @@
-import uuid
+import asyncio
 import json
 from fastapi import APIRouter, HTTPException, Form, UploadFile, Depends, File
 from datetime import datetime
 from typing import Optional, List
 from app.model.schemas import ChatResponse
 from app.chains.chat_chain import _chat_chain
-from app.services.vision_service import describe_image, recognize_tools_in_image
+from app.services.vision_service import aanalyze_image, confident_tool_name
 from app.services.tavily_service import perform_tool_research
+from app.services.knowledge_index import knowledge_index
+from app.services.image_uploads import image_uploads
 from app.services.audio_service import audio_service
 from app.dependencies import optional_image_file_validator, get_current_user, get_user_supabase_client
-from app.config import supabase
+from app.config import settings
 from supabase import Client
 
 try:
@@ -51,6 +53,7 @@ async def chat(
                 chat_id = None
         
         scan_id = None
+        file_path = None
         original_user_message = None  # Track the original transcribed message for voice
         
         # Handle voice input
@@ -93,31 +96,34 @@ async def chat(
         if file:
             image_bytes = await file.read()
             if image_bytes:
-                # Upload image to Supabase
+                # Upload image to Supabase in the background, next to recognition
                 file_ext = file.filename.split(".")[-1] if "." in file.filename else "jpg"
-                file_path = f"{user.id}/{uuid.uuid4()}.{file_ext}"
-                try:
-                    supabase.storage.from_("tool-images").upload(
-                        file=image_bytes,
-                        path=file_path,
-                        file_options={"content-type": file.content_type}
-                    )
-                except Exception as e:
-                    print(f"Failed to upload image: {e}")
-                    # Proceed without saving scan if upload fails? 
-                    # We'll just log it for now.
+                file_path = image_uploads.store(image_bytes, file.content_type, file_ext)
 
-                # First try to recognize a tool
-                tool_name = recognize_tools_in_image(image_bytes)
+                # One vision call both recognizes a tool and describes the image
+                analysis = await aanalyze_image(image_bytes, file.content_type)
+                tool_name = confident_tool_name(analysis)
                 
                 if tool_name:
-                    # If tool found, research it
-                    research_response = perform_tool_research(tool_name)
+                    # If tool found, answer from what we already know about it,
+                    # and only research it on the web when that is too thin
+                    local = await asyncio.to_thread(
+                        knowledge_index.search, tool_name, message, k=settings.knowledge_chat_passages
+                    )
+                    if local.is_sufficient(settings.knowledge_chat_passages):
+                        knowledge_index.record_lookup(local=True)
+                        research_response = knowledge_index.to_research_response(tool_name, message, local)
+                    else:
+                        knowledge_index.record_lookup(local=False)
+                        # Only a few results end up in the prompt, skip videos and transcripts
+                        research_response = await perform_tool_research(tool_name, profile="chat-light")
+                        await asyncio.to_thread(knowledge_index.add_research, tool_name, research_response)
                     
                     # Save Scan
                     scan_data = {
                         "user_id": str(user.id),
-                        "image_path": file_path,
+                        # Filled in once the background upload has finished
+                        "image_path": None,
                         "tool_name": tool_name,
                         "analysis_result": research_response.model_dump(mode='json'),
                     }
@@ -125,6 +131,7 @@ async def chat(
                     scan_res = supabase_client.table("scans").insert(scan_data).execute()
                     if scan_res.data:
                         scan_id = scan_res.data[0]['id']
+                        await asyncio.to_thread(image_uploads.attach, file_path, "scans", scan_id, "image_path")
 
                     # Format research for the LLM
                     research_text = f"Tool Identified: {tool_name}\n\nResearch Results:\n"
@@ -138,7 +145,7 @@ async def chat(
                     )
                 else:
                     # Fallback to general description if no tool recognized
-                    image_description = describe_image(image_bytes)
+                    image_description = analysis.description if analysis else None
                     if image_description:
                         full_message = (
                             f"The user has uploaded an image with the following description: '{image_description}'.\n"
@@ -161,11 +168,15 @@ async def chat(
                 chat_id = chat_res.data[0]['id']
         
         # Save User Message
-        supabase_client.table("messages").insert({
+        message_res = supabase_client.table("messages").insert({
             "chat_id": str(chat_id) if chat_id else None,
             "role": "user",
             "content": message # Save original message, not full_message with context
         }).execute()
+        if file_path and message_res.data:
+            await asyncio.to_thread(
+                image_uploads.attach, file_path, "messages", message_res.data[0]["id"], "image_url", public_url=True
+            )
 
         # Invoke LLM
         # invoke_chat now returns a Pydantic object (LLMStructuredOutput)
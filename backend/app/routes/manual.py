@@ -1,16 +1,28 @@
-import uuid
+import asyncio
 import json
-from typing import Optional
+from dataclasses import dataclass
+from typing import Optional, AsyncIterator, List, Tuple, Union
 from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form
-from fastapi.responses import FileResponse
-from app.model.schemas import ManualGenerationResponse
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, StreamingResponse
+from app.model.schemas import (
+    BatchManualGenerationResponse,
+    BatchManualItem,
+    ManualGenerationResponse,
+    ManualTranslation,
+)
 from app.chains.tool_manual_chain import tool_manual_chain
 from app.services.audio_service import audio_service
+from app.services.knowledge_index import knowledge_index, MANUAL_TOPICS_QUERY, RESEARCH_KINDS
+from app.services.image_uploads import image_uploads
+from app.services.manual_cache import manual_cache
+from app.services.research_context import build_research_context
+from app.services.single_flight import manual_flight
 from app.services.tavily_service import perform_tool_research
-from app.services.vision_service import recognize_tools_in_image
+from app.services.vision_service import aanalyze_image, adetect_tools_in_image, confident_tool_name
 # PDF generation moved to frontend
 from app.dependencies import get_current_user, get_user_supabase_client, image_file_validator
-from app.config import supabase
+from app.config import supabase, settings
 from supabase import Client
 from datetime import datetime
 import os
@@ -30,242 +42,649 @@ except ImportError:
 router = APIRouter(prefix="/api", tags=["Manual Generation"])
 
 
-@router.post("/generate-manual", response_model=ManualGenerationResponse)
-async def generate_tool_manual(
-    file: Optional[UploadFile] = File(None),
-    tool_name: Optional[str] = Form(None),
-    language: str = Form("en"),
-    generate_audio: bool = Form(False),
-    session_id: Optional[str] = Form(None),
-    user: dict = Depends(get_current_user),
-    supabase_client: Client = Depends(get_user_supabase_client)
-):
+@dataclass
+class UploadedImage:
+    """An uploaded image read into memory, so it can outlive the request body"""
+    data: bytes
+    filename: str
+    content_type: str
+
+
+async def read_uploaded_image(file: Optional[UploadFile]) -> Optional[UploadedImage]:
+    """Validate and read an optional image upload"""
+    if not file:
+        return None
+    # Validate image file
+    image_file_validator(file)
+    return UploadedImage(
+        data=await file.read(),
+        filename=file.filename or "upload.jpg",
+        content_type=file.content_type
+    )
+
+
+def upload_tool_image(image: UploadedImage) -> str:
+    """Start storing an uploaded image in the background, returning its storage path"""
+    file_ext = image.filename.split(".")[-1] if "." in image.filename else "jpg"
+    # Content-addressed, identical images share one object
+    return image_uploads.store(image.data, image.content_type, file_ext)
+
+
+def parse_languages(languages: Optional[List[str]]) -> Optional[List[str]]:
+    """Accept repeated `languages` form fields and/or comma-separated values, dropping duplicates"""
+    if not languages:
+        return None
+    parsed = [lang.strip() for value in languages for lang in value.split(",") if lang.strip()]
+    return list(dict.fromkeys(parsed)) or None
+
+
+async def run_manual_pipeline(
+    user,
+    supabase_client: Client,
+    image: Optional[UploadedImage] = None,
+    tool_name: Optional[str] = None,
+    language: str = "en",
+    generate_audio: bool = False,
+    session_id: Optional[str] = None,
+    stream_manual: bool = False,
+    force_refresh: bool = False,
+    parallel_sections: Optional[bool] = None,
+    languages: Optional[List[str]] = None,
+    tool_description: Optional[str] = None,
+    image_path: Optional[str] = None
+) -> AsyncIterator[Tuple[str, dict]]:
     """
-    Generate a comprehensive tool manual.
-    Can accept an image file for tool recognition OR direct tool name.
+    Runs the manual generation pipeline and yields (event, data) pairs as each stage completes.
+
+    Events:
+        stage:  {"stage": "recognized" | "session" | "research" | "scan" | "summary" | "translations", ...}
+        token:  {"text": "..."} manual chunks, only when stream_manual is True
+        result: fields of ManualGenerationResponse (always the last event)
+
+    A fresh manual_cache entry for the tool and language skips research and both
+    LLM calls, unless force_refresh is set. Otherwise research comes from the local
+    knowledge index when it covers the tool well enough, and from the web if not.
+
+    parallel_sections generates the manual as section groups in parallel calls
+    (defaults to the MANUAL_PARALLEL_SECTIONS setting).
+
+    When several languages are given, the first one is generated from research and
+    the others are translated from it concurrently. Each language is cached separately.
+
+    tool_description and image_path let a caller that already analysed and stored
+    the image (multi-tool batches) run the pipeline for a given tool name.
+
+    Raises HTTPException for invalid input, exactly like the non-streaming endpoint.
     """
-    logger.info(f"Manual generation request received. Tool: {tool_name}, Language: {language}, Audio: {generate_audio}")
+    scan_id = None
+    final_tool_name = tool_name
+    manual_context = None
+    summary_context = None
+    file_path = image_path
+    chat_id = None
 
-    try:
-        scan_id = None
-        final_tool_name = tool_name
-        final_research_context = None
-        tool_description = None
-        file_path = None
-        chat_id = None
-
-        # Validate session_id if provided
-        if session_id and session_id.strip():
-            if len(session_id.replace('-', '')) == 32:
-                chat_id = session_id
-            else:
-                chat_id = None
-
-        # 1. Handle File Upload & Recognition
-        if file:
-            # Validate image file
-            image_file_validator(file)
-            
-            image_bytes = await file.read()
-            recognized_name = recognize_tools_in_image(image_bytes)
-            logger.info(f"Image recognition result: {recognized_name}")
-
-            if not recognized_name:
-                logger.warning("No tool recognized in the uploaded image")
-                raise HTTPException(status_code=404, detail="No tool found in the image.")
-            
-            final_tool_name = recognized_name
-            tool_description = f"Recognized from image: {recognized_name}"
-
-            # Upload image to Supabase Storage
-            file_ext = file.filename.split(".")[-1] if "." in file.filename else "jpg"
-            file_path = f"{user.id}/{uuid.uuid4()}.{file_ext}"
-            
-            try:
-                # Use admin client for storage to avoid RLS issues with fresh tokens if any
-                supabase.storage.from_("tool-images").upload(
-                    file=image_bytes,
-                    path=file_path,
-                    file_options={"content-type": file.content_type}
-                )
-                logger.info(f"Image uploaded to Supabase: {file_path}")
-            except Exception as e:
-                logger.error(f"Failed to upload image to Supabase: {e}")
-                # Continue without failing the whole request, but log it
-
-        # 2. Validate Inputs if no file provided
-        if not final_tool_name:
-             raise HTTPException(status_code=400, detail="Either an image file or a tool name is required.")
-
-        # Create Chat Session if needed (and persist user message)
-        if not chat_id:
-            new_chat_id = str(uuid7())
-            chat_title = f"Manual: {final_tool_name}"
-            
-            chat_data = {
-                "id": new_chat_id,
-                "user_id": str(user.id),
-                "title": chat_title,
-                "scan_id": None # We'll update this later if we have a scan_id
-            }
+    # The first requested language is the primary one, the others are translated from it
+    if languages:
+        language = languages[0]
+    extra_languages = [lang for lang in (languages or []) if lang != language]
+
+    # Validate session_id if provided
+    if session_id and session_id.strip():
+        if len(session_id.replace('-', '')) == 32:
+            chat_id = session_id
+        else:
+            chat_id = None
+
+    # 1. Handle File Upload & Recognition
+    if image:
+        # Storage runs in the background, next to recognition
+        file_path = upload_tool_image(image)
+        analysis = await aanalyze_image(image.data, image.content_type)
+        recognized_name = confident_tool_name(analysis)
+        logger.info(f"Image recognition result: {recognized_name}")
+
+        if not recognized_name:
+            logger.warning("No tool recognized in the uploaded image")
+            raise HTTPException(status_code=404, detail="No tool found in the image.")
+
+        final_tool_name = recognized_name
+        tool_description = analysis.description or f"Recognized from image: {recognized_name}"
+
+    # 2. Validate Inputs if no file provided
+    if not final_tool_name:
+        raise HTTPException(status_code=400, detail="Either an image file or a tool name is required.")
+
+    yield "stage", {"stage": "recognized", "tool_name": final_tool_name}
+
+    # Create Chat Session if needed (and persist user message)
+    if not chat_id:
+        new_chat_id = str(uuid7())
+        chat_title = f"Manual: {final_tool_name}"
+
+        chat_data = {
+            "id": new_chat_id,
+            "user_id": str(user.id),
+            "title": chat_title,
+            "scan_id": None # We'll update this later if we have a scan_id
+        }
+        try:
             chat_res = supabase_client.table("chats").insert(chat_data).execute()
             if chat_res.data:
                 chat_id = chat_res.data[0]['id']
                 logger.info(f"New chat session created: {chat_id}")
             else:
                 logger.error("Failed to create new chat session")
+        except Exception as e:
+            logger.error(f"Failed to create new chat session: {e}")
 
-        # Save User Message
-        user_content = f"Generate manual for {final_tool_name}"
-        if file:
-            user_content = "Generate manual for this tool (image uploaded)"
-        
-        # Get public URL for image if it exists
-        image_url = None
-        if file_path:
-             image_url = supabase.storage.from_("tool-images").get_public_url(file_path)
+    # Save User Message
+    user_content = f"Generate manual for {final_tool_name}"
+    if image:
+        user_content = "Generate manual for this tool (image uploaded)"
 
-        try:
-            supabase_client.table("messages").insert({
-                "chat_id": str(chat_id) if chat_id else None,
-                "role": "user",
-                "content": user_content,
-                "image_url": image_url # Assuming schema supports this, otherwise append to content
-            }).execute()
-            logger.info(f"User message saved to chat: {chat_id}")
-        except Exception as e:
-            logger.error(f"Failed to save user message: {e}")
+    try:
+        # image_url is filled in once the background upload has finished
+        message_res = supabase_client.table("messages").insert({
+            "chat_id": str(chat_id) if chat_id else None,
+            "role": "user",
+            "content": user_content
+        }).execute()
+        logger.info(f"User message saved to chat: {chat_id}")
+        if file_path and message_res.data:
+            await asyncio.to_thread(
+                image_uploads.attach, file_path, "messages", message_res.data[0]["id"], "image_url", public_url=True
+            )
+    except Exception as e:
+        logger.error(f"Failed to save user message: {e}")
 
+    yield "stage", {"stage": "session", "session_id": chat_id}
 
-        # 3. Perform Research (ALWAYS)
-        logger.info(f"Performing research for tool: {final_tool_name}")
-        research_results = perform_tool_research(tool_name=final_tool_name)
-        final_research_context = json.dumps(research_results.model_dump(mode='json'), indent=2)
+    # 3. Look up the manual cache, otherwise perform research
+    cached = None if force_refresh else manual_cache.get(final_tool_name, language)
+    if cached:
+        logger.info(f"Manual cache hit for tool: {final_tool_name} ({language})")
+        research_data = cached.get("research")
+        yield "stage", {"stage": "research", "cached": True}
+    else:
+        local = None
+        if not force_refresh:
+            local = await asyncio.to_thread(
+                knowledge_index.search,
+                final_tool_name,
+                f"{final_tool_name} {MANUAL_TOPICS_QUERY}",
+                k=settings.knowledge_manual_passages,
+                # Never rebuild a manual from earlier manuals, only from research
+                kinds=RESEARCH_KINDS
+            )
+        if local and local.is_sufficient(settings.knowledge_manual_min_passages):
+            logger.info(f"Using local knowledge for tool: {final_tool_name} ({len(local.passages)} passages)")
+            knowledge_index.record_lookup(local=True)
+            research_results = knowledge_index.to_research_response(final_tool_name, MANUAL_TOPICS_QUERY, local)
+            research_source = "local"
+        else:
+            logger.info(f"Performing research for tool: {final_tool_name}")
+            knowledge_index.record_lookup(local=False)
+            research_results = await perform_tool_research(tool_name=final_tool_name, profile="manual-full")
+            await asyncio.to_thread(knowledge_index.add_research, final_tool_name, research_results)
+            research_source = "web"
+        research_data = research_results.model_dump(mode='json')
         logger.info("Research completed successfully")
 
-        # 4. Save Scan Data (Research Result)
-        # We save this for both image-based and text-based requests
-        scan_data = {
-            "user_id": str(user.id),
-            "tool_name": final_tool_name,
-            "analysis_result": research_results.model_dump(mode='json'),
-            "image_path": file_path if file else None
+        # Compact, ranked context sized separately for each prompt
+        manual_context = build_research_context(research_results, settings.manual_context_tokens)
+        summary_context = build_research_context(research_results, settings.summary_context_tokens)
+        logger.info(
+            f"Research context: manual {manual_context.tokens} tokens, summary {summary_context.tokens} tokens "
+            f"(raw {manual_context.original_tokens}, saved {manual_context.saved_tokens + summary_context.saved_tokens})"
+        )
+
+        yield "stage", {
+            "stage": "research",
+            "cached": False,
+            "source": research_source,
+            "research_results": len(research_results.research_results),
+            "youtube_results": len(research_results.youtube_info),
+            "context_tokens": manual_context.tokens + summary_context.tokens,
+            "context_tokens_saved": manual_context.saved_tokens + summary_context.saved_tokens
         }
-        
+
+    # 4. Save Scan Data (Research Result)
+    # We save this for both image-based and text-based requests
+    scan_data = {
+        "user_id": str(user.id),
+        "tool_name": final_tool_name,
+        "analysis_result": research_data,
+        # Filled in once the background upload has finished
+        "image_path": None
+    }
+
+    try:
+        scan_response = supabase.table("scans").insert(scan_data).execute()
+        if scan_response.data:
+            scan_id = scan_response.data[0]['id']
+            logger.info(f"Scan data saved: {scan_id}")
+            if file_path:
+                await asyncio.to_thread(image_uploads.attach, file_path, "scans", scan_id, "image_path")
+            # Update chat with scan_id
+            if chat_id:
+                supabase_client.table("chats").update({"scan_id": scan_id}).eq("id", chat_id).execute()
+                logger.info(f"Chat {chat_id} updated with scan_id {scan_id}")
+    except Exception as e:
+        logger.error(f"Failed to save scan data: {e}")
+
+    yield "stage", {"stage": "scan", "scan_id": scan_id}
+
+    async def generate_summary_audio(summary: str) -> Optional[dict]:
+        logger.info("Generating audio for summary...")
         try:
-            scan_response = supabase.table("scans").insert(scan_data).execute()
-            if scan_response.data:
-                scan_id = scan_response.data[0]['id']
-                logger.info(f"Scan data saved: {scan_id}")
-                # Update chat with scan_id
-                if chat_id:
-                     supabase_client.table("chats").update({"scan_id": scan_id}).eq("id", chat_id).execute()
-                     logger.info(f"Chat {chat_id} updated with scan_id {scan_id}")
+            # Cached per text and voice, synthesis runs off the event loop
+            audio_url = await audio_service.agenerate_audio(text=summary)
+            logger.info(f"Audio generated: {audio_url}")
+            return {
+                "url": audio_url,
+                "generated_at": datetime.now().isoformat()
+            }
         except Exception as e:
-            logger.error(f"Failed to save scan data: {e}")
-
-        # 5. Generate Manual
-        logger.info("Generating manual content...")
-        manual = tool_manual_chain.generate_manual(
-            tool_name=final_tool_name,
-            research_context=final_research_context,
-            tool_description=tool_description,
-            language=language
-        )
-        logger.info("Manual content generated")
-        
-        # 6. Generate Summary
+            logger.error(f"Audio generation failed: {e}")
+            # Don't fail the request if audio fails
+            return None
+
+    # Identical concurrent requests share one manual and one summary LLM call
+    flight_key = manual_cache.make_key(final_tool_name, language)
+
+    async def generate_summary_and_audio():
         logger.info("Generating summary...")
-        summary = tool_manual_chain.generate_quick_summary(
-            tool_name=final_tool_name,
-            research_context=final_research_context,
-            language=language
+        summary = await manual_flight.run(
+            f"summary|{flight_key}",
+            lambda: tool_manual_chain.agenerate_quick_summary(
+                tool_name=final_tool_name,
+                research_context=summary_context.text,
+                language=language
+            )
         )
         logger.info("Summary generated")
 
-        # Ensure summary and manual are never just empty or None
+        # An empty summary is replaced by a placeholder below and never cached
         if not summary or len(summary.strip()) < 5:
-            summary = f"A summary for {final_tool_name} could not be generated at this time, but you can find details in the manual below."
-        
-        if not manual or len(manual.strip()) < 5:
-            manual = f"Detailed manual generation for {final_tool_name} failed. Please try again or provide more details."
+            return None, None
 
-        
-        # 7. Generate Audio (Optional)
         audio_files_data = None
         if generate_audio:
-            logger.info("Generating audio for summary...")
-            try:
-                audio_url = audio_service.generate_audio(
-                    text=summary,
+            audio_files_data = await generate_summary_audio(summary)
+
+        return summary, audio_files_data
+
+    if cached:
+        # 5-7. Serve Manual and Summary from the cache, only generate missing audio
+        manual = cached["manual"]
+        summary = cached["summary"]
+        audio_files_data = cached.get("audio_files")
+        if generate_audio and not audio_files_data:
+            audio_files_data = await generate_summary_audio(summary)
+            if audio_files_data:
+                manual_cache.update_audio(final_tool_name, language, audio_files_data)
+        if stream_manual:
+            yield "token", {"text": manual}
+    else:
+        # 5-7. Generate Manual, Summary and Audio concurrently.
+        # The manual and the summary are independent LLM calls, and audio only
+        # depends on the summary, so the request waits for the slowest branch
+        # instead of the sum of all three.
+        if parallel_sections is None:
+            parallel_sections = settings.manual_parallel_sections
+
+        summary_task = asyncio.create_task(generate_summary_and_audio())
+        try:
+            logger.info(f"Generating manual content (parallel sections: {parallel_sections})...")
+            stream = (
+                tool_manual_chain.astream_manual_sections
+                if parallel_sections else tool_manual_chain.astream_manual
+            )
+            chunks = []
+            async for chunk in manual_flight.stream(
+                f"manual|{flight_key}",
+                lambda: stream(
                     tool_name=final_tool_name,
-                    user_id=str(user.id)
+                    research_context=manual_context.text,
+                    tool_description=tool_description,
+                    language=language
                 )
-                
-                audio_files_data = {
-                    "url": audio_url,
-                    "generated_at": datetime.now().isoformat()
-                }
-                logger.info(f"Audio generated: {audio_url}")
-            except Exception as e:
-                logger.error(f"Audio generation failed: {e}")
-                # Don't fail the request if audio fails
-                pass
+            ):
+                chunks.append(chunk)
+                if stream_manual:
+                    yield "token", {"text": chunk}
+            manual = "".join(chunks)
+            logger.info("Manual content generated")
 
-        # PDF generation has been moved to frontend
+            summary, audio_files_data = await summary_task
+        finally:
+            # Client went away or the manual failed, don't leave the summary running
+            if not summary_task.done():
+                summary_task.cancel()
 
-        # 8. Save Manual to Database
-        manual_data = {
-            "user_id": str(user.id),
-            "scan_id": scan_id,
-            "tool_name": final_tool_name,
-            "manual_content": manual,
-            "summary_content": summary,
-            "audio_files": audio_files_data
-        }
-        
-        try:
-            supabase.table("manuals").insert(manual_data).execute()
-            logger.info("Manual saved to database")
-        except Exception as e:
-            logger.error(f"Database insertion failed for manual: {e}")
-            # Don't fail the whole request just because history saving failed
-            pass
-
-        # Save Assistant Message (Summary + Manual Metadata)
-        # We'll save the summary as the content. The frontend can render the manual button/PDF based on context or we can append a link.
-        # For now, let's just save the summary. The frontend handles the "real-time" manual display.
-        # To persist the PDF/Manual availability, we might need to store the manual ID or content in the message metadata if the schema allows,
-        # or just rely on the summary text.
-        
-        # Ideally, we should store the PDF URL if we generated it, but PDF is generated on frontend.
-        # So we just store the summary.
-        
-        assistant_msg_data = {
-            "chat_id": str(chat_id) if chat_id else None,
-            "role": "assistant",
-            "content": summary,
-            "audio_url": audio_files_data['url'] if audio_files_data else None
-        }
-        
+        # Only cache complete results, never the fallback messages
+        if summary and manual and len(manual.strip()) >= 5:
+            manual_cache.set(
+                final_tool_name,
+                language,
+                manual=manual,
+                summary=summary,
+                research=research_data,
+                audio_files=audio_files_data
+            )
+
+    # Only translate real content, never the fallback messages
+    primary_generated = bool(summary and manual and len(manual.strip()) >= 5)
+    if primary_generated and not cached:
+        await asyncio.to_thread(knowledge_index.add_manual, final_tool_name, manual)
+
+    # Ensure summary and manual are never just empty or None
+    if not summary:
+        summary = f"A summary for {final_tool_name} could not be generated at this time, but you can find details in the manual below."
+
+    if not manual or len(manual.strip()) < 5:
+        manual = f"Detailed manual generation for {final_tool_name} failed. Please try again or provide more details."
+
+    yield "stage", {"stage": "summary", "summary": summary}
+
+    # 7b. Additional languages, translated from the primary manual in parallel
+    async def produce_translation(target_language: str) -> Optional[ManualTranslation]:
+        cached_translation = None if force_refresh else manual_cache.get(final_tool_name, target_language)
+        if cached_translation:
+            return ManualTranslation(
+                language=target_language,
+                manual=cached_translation["manual"],
+                summary=cached_translation["summary"],
+                cached=True
+            )
         try:
-            supabase_client.table("messages").insert(assistant_msg_data).execute()
-            logger.info("Assistant message saved to chat")
+            translated_manual, translated_summary = await asyncio.gather(
+                tool_manual_chain.atranslate(manual, final_tool_name, target_language, "tool manual"),
+                tool_manual_chain.atranslate(summary, final_tool_name, target_language, "tool summary")
+            )
         except Exception as e:
-            logger.error(f"Failed to save assistant message: {e}")
-
-        return ManualGenerationResponse(
-            tool_name=final_tool_name,
-            manual=manual,
-            summary=summary,
-            audio_files=audio_files_data,
-            timestamp=datetime.now(),
-            session_id=chat_id # Return the session ID
+            logger.error(f"Translation to {target_language} failed: {e}")
+            return None
+        if not translated_manual or not translated_summary:
+            return None
+
+        manual_cache.set(
+            final_tool_name,
+            target_language,
+            manual=translated_manual,
+            summary=translated_summary,
+            research=research_data
         )
-        
+        return ManualTranslation(
+            language=target_language,
+            manual=translated_manual,
+            summary=translated_summary
+        )
+
+    translations = []
+    if extra_languages and primary_generated:
+        logger.info(f"Producing additional languages: {extra_languages}")
+        results = await asyncio.gather(*(produce_translation(lang) for lang in extra_languages))
+        translations = [t for t in results if t is not None]
+        yield "stage", {"stage": "translations", "languages": [t.language for t in translations]}
+
+    # PDF generation has been moved to frontend
+
+    # 8. Save Manual to Database
+    manual_data = {
+        "user_id": str(user.id),
+        "scan_id": scan_id,
+        "tool_name": final_tool_name,
+        "manual_content": manual,
+        "summary_content": summary,
+        "language": language,
+        "audio_files": audio_files_data
+    }
+
+    # One row per language, all linked to the same scan
+    manual_rows = [manual_data] + [
+        {
+            **manual_data,
+            "manual_content": t.manual,
+            "summary_content": t.summary,
+            "language": t.language,
+            "translated_from": language,
+            "audio_files": None
+        }
+        for t in translations
+    ]
+
+    try:
+        supabase.table("manuals").insert(manual_rows).execute()
+        logger.info(f"Manual saved to database ({len(manual_rows)} languages)")
+    except Exception as e:
+        logger.error(f"Database insertion failed for manual: {e}")
+        # Don't fail the whole request just because history saving failed
+        pass
+
+    # Save Assistant Message (Summary + Manual Metadata)
+    # We'll save the summary as the content. The frontend can render the manual button/PDF based on context or we can append a link.
+    # For now, let's just save the summary. The frontend handles the "real-time" manual display.
+    # To persist the PDF/Manual availability, we might need to store the manual ID or content in the message metadata if the schema allows,
+    # or just rely on the summary text.
+
+    # Ideally, we should store the PDF URL if we generated it, but PDF is generated on frontend.
+    # So we just store the summary.
+
+    assistant_msg_data = {
+        "chat_id": str(chat_id) if chat_id else None,
+        "role": "assistant",
+        "content": summary,
+        "audio_url": audio_files_data['url'] if audio_files_data else None
+    }
+
+    try:
+        supabase_client.table("messages").insert(assistant_msg_data).execute()
+        logger.info("Assistant message saved to chat")
+    except Exception as e:
+        logger.error(f"Failed to save assistant message: {e}")
+
+    response = ManualGenerationResponse(
+        tool_name=final_tool_name,
+        manual=manual,
+        summary=summary,
+        language=language,
+        translations=translations,
+        audio_files=audio_files_data,
+        timestamp=datetime.now(),
+        session_id=chat_id, # Return the session ID
+        cached=bool(cached)
+    )
+    yield "result", jsonable_encoder(response)
+
+
+async def run_multi_tool_batch(
+    user,
+    supabase_client: Client,
+    image: UploadedImage,
+    language: str = "en",
+    generate_audio: bool = False,
+    force_refresh: bool = False,
+    parallel_sections: Optional[bool] = None,
+    languages: Optional[List[str]] = None
+) -> BatchManualGenerationResponse:
+    """
+    Detects every tool in one image and generates a manual for each.
+
+    The image is analysed and stored once. Each tool then goes through the full
+    manual pipeline (with its own session and scan), at most MULTI_TOOL_CONCURRENCY
+    at a time. A tool whose pipeline fails is reported with an error instead of
+    failing the batch.
+    """
+    # Storage runs in the background, next to detection
+    file_path = upload_tool_image(image)
+    detection = await adetect_tools_in_image(image.data, image.content_type)
+    if detection is None or not detection.tools:
+        logger.warning("No tools detected in the uploaded image")
+        raise HTTPException(status_code=404, detail="No tool found in the image.")
+    logger.info(f"Detected {len(detection.tools)} tools: {[tool.name for tool in detection.tools]}")
+
+    semaphore = asyncio.Semaphore(settings.multi_tool_concurrency)
+
+    async def generate_for_tool(tool) -> BatchManualItem:
+        async with semaphore:
+            try:
+                result = None
+                async for event, data in run_manual_pipeline(
+                    user,
+                    supabase_client,
+                    tool_name=tool.name,
+                    language=language,
+                    generate_audio=generate_audio,
+                    force_refresh=force_refresh,
+                    parallel_sections=parallel_sections,
+                    languages=languages,
+                    tool_description=detection.description or None,
+                    image_path=file_path
+                ):
+                    if event == "result":
+                        result = data
+                return BatchManualItem(tool_name=tool.name, box=tool.box, result=ManualGenerationResponse(**result))
+            except Exception as e:
+                detail = e.detail if isinstance(e, HTTPException) else str(e)
+                logger.error(f"Manual generation failed for detected tool {tool.name}: {detail}")
+                return BatchManualItem(tool_name=tool.name, box=tool.box, error=detail)
+
+    items = await asyncio.gather(*(generate_for_tool(tool) for tool in detection.tools))
+    return BatchManualGenerationResponse(
+        description=detection.description,
+        tools=list(items),
+        timestamp=datetime.now()
+    )
+
+
+def format_sse(event: str, data: dict) -> str:
+    """Serialize one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/generate-manual", response_model=Union[ManualGenerationResponse, BatchManualGenerationResponse])
+async def generate_tool_manual(
+    file: Optional[UploadFile] = File(None),
+    tool_name: Optional[str] = Form(None),
+    language: str = Form("en"),
+    languages: Optional[List[str]] = Form(None),
+    generate_audio: bool = Form(False),
+    session_id: Optional[str] = Form(None),
+    force_refresh: bool = Form(False),
+    parallel_sections: Optional[bool] = Form(None),
+    multi_tool: bool = Form(False),
+    user: dict = Depends(get_current_user),
+    supabase_client: Client = Depends(get_user_supabase_client)
+):
+    """
+    Generate a comprehensive tool manual.
+    Can accept an image file for tool recognition OR direct tool name.
+    Cached manuals are reused unless force_refresh is set.
+    `languages` (repeated or comma-separated) produces several languages from one research pass.
+    `multi_tool` with an image generates a manual for every tool detected in it and
+    returns them as a batch.
+    """
+    logger.info(f"Manual generation request received. Tool: {tool_name}, Language: {language}, Audio: {generate_audio}")
+
+    try:
+        image = await read_uploaded_image(file)
+
+        if multi_tool:
+            if not image:
+                raise HTTPException(status_code=400, detail="multi_tool requires an image file.")
+            return await run_multi_tool_batch(
+                user,
+                supabase_client,
+                image,
+                language=language,
+                generate_audio=generate_audio,
+                force_refresh=force_refresh,
+                parallel_sections=parallel_sections,
+                languages=parse_languages(languages)
+            )
+
+        result = None
+        async for event, data in run_manual_pipeline(
+            user,
+            supabase_client,
+            image=image,
+            tool_name=tool_name,
+            language=language,
+            generate_audio=generate_audio,
+            session_id=session_id,
+            force_refresh=force_refresh,
+            parallel_sections=parallel_sections,
+            languages=parse_languages(languages)
+        ):
+            if event == "result":
+                result = data
+
+        return ManualGenerationResponse(**result)
+
     except HTTPException as e:
         logger.error(f"HTTP Exception in manual generation: {e.detail}")
         raise e
     except Exception as e:
         logger.error(f"Unexpected error in manual generation: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Manual generation error: {str(e)}")
+
+
+@router.post("/generate-manual/stream")
+async def generate_tool_manual_stream(
+    file: Optional[UploadFile] = File(None),
+    tool_name: Optional[str] = Form(None),
+    language: str = Form("en"),
+    languages: Optional[List[str]] = Form(None),
+    generate_audio: bool = Form(False),
+    session_id: Optional[str] = Form(None),
+    force_refresh: bool = Form(False),
+    parallel_sections: Optional[bool] = Form(None),
+    user: dict = Depends(get_current_user),
+    supabase_client: Client = Depends(get_user_supabase_client)
+):
+    """
+    Streaming variant of /generate-manual using Server-Sent Events.
+
+    Emits `stage` events as the pipeline progresses (recognized tool, session,
+    research, scan id, summary), `token` events with manual text as the LLM
+    produces it, and a final `result` event with the ManualGenerationResponse
+    fields. Failures are reported as an `error` event.
+    """
+    logger.info(f"Streaming manual generation request received. Tool: {tool_name}, Language: {language}, Audio: {generate_audio}")
+
+    # Read the upload before the response starts, the request body is gone afterwards
+    image = await read_uploaded_image(file)
+
+    async def event_stream():
+        try:
+            async for event, data in run_manual_pipeline(
+                user,
+                supabase_client,
+                image=image,
+                tool_name=tool_name,
+                language=language,
+                generate_audio=generate_audio,
+                session_id=session_id,
+                stream_manual=True,
+                force_refresh=force_refresh,
+                parallel_sections=parallel_sections,
+                languages=parse_languages(languages)
+            ):
+                yield format_sse(event, data)
+        except HTTPException as e:
+            logger.error(f"HTTP Exception in streaming manual generation: {e.detail}")
+            yield format_sse("error", {"status_code": e.status_code, "detail": e.detail})
+        except Exception as e:
+            logger.error(f"Unexpected error in streaming manual generation: {str(e)}", exc_info=True)
+            yield format_sse("error", {"status_code": 500, "detail": f"Manual generation error: {str(e)}"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # Stop reverse proxies from buffering the stream
+            "X-Accel-Buffering": "no"
+        }
+    )
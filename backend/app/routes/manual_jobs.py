@@ -0,0 +1,112 @@
+from typing import Optional, List
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form, status
+from app.model.schemas import ManualJobResponse
+from app.routes.manual import run_manual_pipeline, read_uploaded_image, parse_languages
+from app.services.manual_jobs import manual_job_manager
+from app.dependencies import get_current_user
+from app.config import supabase
+import logging
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api", tags=["Manual Jobs"])
+
+
+def to_job_response(job: dict) -> ManualJobResponse:
+    return ManualJobResponse(
+        job_id=job["id"],
+        status=job["status"],
+        current_stage=job["current_stage"],
+        progress=job["progress"],
+        stages=job["stages"],
+        result=job["result"],
+        error=job["error"],
+        created_at=job["created_at"],
+        updated_at=job["updated_at"]
+    )
+
+
+def owned_session_id(session_id: Optional[str], user) -> Optional[str]:
+    """session_id if it is one of the user's chats, otherwise None (a new chat is created)"""
+    if not session_id or not session_id.strip():
+        return None
+    try:
+        res = supabase.table("chats").select("id").eq("id", session_id).eq("user_id", str(user.id)).execute()
+    except Exception as e:
+        logger.warning(f"Could not check chat session {session_id}: {e}")
+        return None
+    return session_id if res.data else None
+
+
+def get_owned_job(job_id: str, user) -> dict:
+    """Fetch a job and make sure it belongs to the current user"""
+    job = manual_job_manager.get(job_id)
+    if not job or job["user_id"] != str(user.id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.post("/manual-jobs", response_model=ManualJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_manual_job(
+    file: Optional[UploadFile] = File(None),
+    tool_name: Optional[str] = Form(None),
+    language: str = Form("en"),
+    languages: Optional[List[str]] = Form(None),
+    generate_audio: bool = Form(False),
+    session_id: Optional[str] = Form(None),
+    force_refresh: bool = Form(False),
+    parallel_sections: Optional[bool] = Form(None),
+    user: dict = Depends(get_current_user)
+):
+    """
+    Queue a manual generation job and return its id immediately.
+    Takes the same inputs as /generate-manual; poll /manual-jobs/{job_id} for the result.
+    """
+    if not file and not tool_name:
+        raise HTTPException(status_code=400, detail="Either an image file or a tool name is required.")
+
+    # Before reading the upload, a queued job keeps its bytes in memory
+    manual_job_manager.ensure_capacity()
+    # Read the upload now, the request body is gone once we return
+    image = await read_uploaded_image(file)
+    # A queued job can start after the user's token has expired, so it writes
+    # with the service client; rows carry the user_id explicitly
+    session_id = owned_session_id(session_id, user)
+
+    job = manual_job_manager.submit(
+        user_id=str(user.id),
+        pipeline=lambda: run_manual_pipeline(
+            user,
+            supabase,
+            image=image,
+            tool_name=tool_name,
+            language=language,
+            generate_audio=generate_audio,
+            session_id=session_id,
+            force_refresh=force_refresh,
+            parallel_sections=parallel_sections,
+            languages=parse_languages(languages)
+        )
+    )
+    logger.info(f"Manual job {job['id']} queued. Tool: {tool_name}, Language: {language}")
+    return to_job_response(job)
+
+
+@router.get("/manual-jobs/{job_id}", response_model=ManualJobResponse)
+async def get_manual_job(
+    job_id: str,
+    user: dict = Depends(get_current_user)
+):
+    """Report status, per-stage progress and, once completed, the generated manual."""
+    return to_job_response(get_owned_job(job_id, user))
+
+
+@router.delete("/manual-jobs/{job_id}", response_model=ManualJobResponse)
+async def cancel_manual_job(
+    job_id: str,
+    user: dict = Depends(get_current_user)
+):
+    """Cancel a queued or running job. Finished jobs are left as they are."""
+    get_owned_job(job_id, user)
+    return to_job_response(manual_job_manager.cancel(job_id))
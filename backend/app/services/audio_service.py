@@ -1,10 +1,11 @@
+import asyncio
 import os
 import tempfile
 import requests
 from google import genai
-from datetime import datetime
-from datetime import datetime
 from app.config import settings, gemini_client
+from app.services.content_store import content_store
+from app.services.tts_cache import tts_cache
 
 # Initialize Gemini Client
 client = gemini_client
@@ -12,6 +13,8 @@ client = gemini_client
 
 # YarnGPT API Configuration
 YARNGPT_API_URL = "https://yarngpt.ai/api/v1/tts"
+YARNGPT_VOICE = "Idera" # Default voice
+TTS_PROVIDER = "yarngpt"
 
 class AudioService:
     """Service for handling audio operations: TTS and STT"""
@@ -51,66 +54,55 @@ class AudioService:
         
         return text.strip()
 
-    def generate_audio(self, text, tool_name, user_id):
+    async def agenerate_audio(self, text: str) -> str:
         """
-        Generate audio file from text using YarnGPT and upload to Supabase.
+        Generate audio from text using YarnGPT and upload it to Supabase,
+        returning the public URL. Text that was spoken before returns the cached
+        URL, synthesis runs in a worker thread, and concurrent requests for the
+        same text share one YarnGPT call.
         """
         try:
-            # Clean text before processing
             text = self.clean_text_for_tts(text)
-            
-            # Prepare headers
-            if not settings.yarngpt_api_key:
-                pass
-            
-            headers = {
-                "Authorization": f"Bearer {settings.yarngpt_api_key}",
-                "Content-Type": "application/json"
-            }
+            key = tts_cache.make_key(text, YARNGPT_VOICE, TTS_PROVIDER)
+            return await tts_cache.get_or_generate(key, lambda: asyncio.to_thread(self._synthesize, text))
+        except Exception as e:
+            raise Exception(f"Audio generation error: {str(e)}")
 
-            # Prepare request to YarnGPT
-            payload = {
-                "text": text,
-                "voice": "Idera", # Default voice
-            }
-            
-            response = requests.post(YARNGPT_API_URL, json=payload, headers=headers, stream=True)
-            
-            if response.status_code != 200:
-                raise Exception(f"YarnGPT API failed: {response.text}")
-            
-            # Create filename
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            safe_name = "".join(c if c.isalnum() else "_" for c in tool_name)
-            filename = f"{safe_name}_{timestamp}.mp3"
-            
-            # Stream to memory
-            import io
-            audio_buffer = io.BytesIO()
-            for chunk in response.iter_content(chunk_size=8192):
-                audio_buffer.write(chunk)
-            
-            audio_content = audio_buffer.getvalue()
+    def _synthesize(self, text: str) -> str:
+        """Call YarnGPT for cleaned text and store the audio, returning its public URL (blocking)"""
+        # Prepare headers
+        if not settings.yarngpt_api_key:
+            pass
+        
+        headers = {
+            "Authorization": f"Bearer {settings.yarngpt_api_key}",
+            "Content-Type": "application/json"
+        }
 
-            # Upload to Supabase Storage
-            from app.config import supabase
-            storage_path = f"{user_id}/{filename}"
-            bucket_name = "tool-audio"
-            
-            supabase.storage.from_(bucket_name).upload(
-                file=audio_content,
-                path=storage_path,
-                file_options={"content-type": "audio/mp3"}
-            )
-            
-            # Get Public URL
-            public_url = supabase.storage.from_(bucket_name).get_public_url(storage_path)
-            
-            return public_url
-            
-        except Exception as e:
+        # Prepare request to YarnGPT
+        payload = {
+            "text": text,
+            "voice": YARNGPT_VOICE,
+        }
+        
+        response = requests.post(YARNGPT_API_URL, json=payload, headers=headers, stream=True)
+        
+        if response.status_code != 200:
+            raise Exception(f"YarnGPT API failed: {response.text}")
+        
+        # Stream to memory
+        import io
+        audio_buffer = io.BytesIO()
+        for chunk in response.iter_content(chunk_size=8192):
+            audio_buffer.write(chunk)
+        
+        audio_content = audio_buffer.getvalue()
 
-            raise Exception(f"Audio generation error: {str(e)}")
+        # Upload to Supabase Storage, named by content hash so identical
+        # audio reuses the stored file
+        stored = content_store.upload("tool-audio", audio_content, "mp3", "audio/mp3")
+        
+        return stored.public_url
 
 
     def transcribe_audio(self, audio_bytes: bytes, mime_type: str = "audio/mp3") -> str:
@@ -0,0 +1,189 @@
+"""
+Two-tier caching primitives shared by the services.
+
+An in-process LRU answers repeat lookups without I/O, and an optional SQLite
+store keeps entries across restarts. Entries carry the time they were stored
+so each cache can decide its own TTL policy.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Optional, Tuple
+
+from app.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheEntry:
+    """A cached value and the unix time it was stored at"""
+    value: Any
+    stored_at: float
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.stored_at
+
+
+class LRUCache:
+    """Thread-safe, size-bounded in-memory LRU."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._data: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: CacheEntry):
+        with self._lock:
+            self._data[key] = entry
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCacheStore:
+    """Persistent key/value table in a local SQLite file. Values are stored as JSON."""
+
+    def __init__(self, table: str, path: Optional[str] = None):
+        self.table = table
+        self.path = path or os.path.join(settings.cache_dir, "toolify_cache.sqlite3")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, stored_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return CacheEntry(value=json.loads(row[0]), stored_at=row[1])
+
+    def set(self, key: str, entry: CacheEntry):
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, stored_at) VALUES (?, ?, ?)",
+                (key, json.dumps(entry.value), entry.stored_at)
+            )
+            self._conn.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self._conn.commit()
+
+
+class TieredCache:
+    """
+    LRU in front of an optional persistent store.
+
+    get() only returns entries younger than ttl_seconds; older entries count as
+    misses so the caller regenerates and overwrites them. lookup() can also
+    serve expired entries within a stale window (stale-while-revalidate).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_size: int,
+        ttl_seconds: float,
+        store: Optional[SQLiteCacheStore] = None
+    ):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.memory = LRUCache(max_size)
+        self.store = store
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def get_entry(self, key: str) -> Optional[CacheEntry]:
+        """Return the entry for key regardless of age, promoting store hits into memory."""
+        entry = self.memory.get(key)
+        if entry is None and self.store is not None:
+            try:
+                entry = self.store.get(key)
+            except Exception as e:
+                logger.warning(f"[{self.name}] cache store read failed: {e}")
+                entry = None
+            if entry is not None:
+                self.memory.set(key, entry)
+        return entry
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self.get_entry(key)
+        if entry is None or entry.age > self.ttl_seconds:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry.value
+
+    def lookup(self, key: str, stale_seconds: float = 0) -> Tuple[Optional[Any], str]:
+        """
+        Return (value, state) where state is "fresh", "stale" or "miss".
+        Entries past the TTL but within stale_seconds more are returned as "stale".
+        """
+        entry = self.get_entry(key)
+        if entry is not None:
+            if entry.age <= self.ttl_seconds:
+                self.hits += 1
+                return entry.value, "fresh"
+            if entry.age <= self.ttl_seconds + stale_seconds:
+                self.stale_hits += 1
+                return entry.value, "stale"
+        self.misses += 1
+        return None, "miss"
+
+    def set(self, key: str, value: Any, stored_at: Optional[float] = None):
+        entry = CacheEntry(value=value, stored_at=stored_at or time.time())
+        self.memory.set(key, entry)
+        if self.store is not None:
+            try:
+                self.store.set(key, entry)
+            except Exception as e:
+                logger.warning(f"[{self.name}] cache store write failed: {e}")
+
+    def delete(self, key: str):
+        self.memory.delete(key)
+        if self.store is not None:
+            self.store.delete(key)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "name": self.name,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self.memory),
+        }
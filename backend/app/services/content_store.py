@@ -0,0 +1,137 @@
+"""
+Content-addressed storage for uploaded images and generated audio.
+
+Objects are stored under the SHA-256 of their bytes, so identical content always
+maps to the same storage path. A local SQLite index remembers which hashes are
+already in each bucket. Repeated content reuses the existing path and public URL
+instead of being uploaded again.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+from app.config import settings, supabase
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def content_path(digest: str, extension: str) -> str:
+    """Storage path of an object, the same for every copy of the same bytes"""
+    return f"content/{digest[:2]}/{digest}.{extension.lstrip('.').lower() or 'bin'}"
+
+
+@dataclass
+class StoredObject:
+    bucket: str
+    path: str
+    public_url: str
+    reused: bool = False
+
+
+class ContentStore:
+    """Index of hash -> storage object per bucket, and uploads that consult it"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(settings.cache_dir, "content_index.sqlite3")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS objects ("
+                "bucket TEXT NOT NULL, hash TEXT NOT NULL, path TEXT NOT NULL, public_url TEXT NOT NULL, "
+                "size INTEGER NOT NULL, created_at REAL NOT NULL, PRIMARY KEY (bucket, hash))"
+            )
+            self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+    def find(self, bucket: str, digest: str, size: int = 0) -> Optional[StoredObject]:
+        """The stored object with these bytes, if the index knows one"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT path, public_url FROM objects WHERE bucket = ? AND hash = ?", (bucket, digest)
+            ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.bytes_saved += size
+        logger.info(f"Reusing stored object {bucket}/{row[0]}")
+        return StoredObject(bucket, row[0], row[1], reused=True)
+
+    def contains(self, bucket: str, path: str) -> bool:
+        """Whether the index knows the object at this path to be in storage"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM objects WHERE bucket = ? AND path = ?", (bucket, path)
+            ).fetchone()
+        return row is not None
+
+    def record(self, bucket: str, digest: str, path: str, size: int) -> StoredObject:
+        """Remember an object that is now in storage"""
+        public_url = supabase.storage.from_(bucket).get_public_url(path)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO objects (bucket, hash, path, public_url, size, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (bucket, digest, path, public_url, size, time.time())
+            )
+            self._conn.commit()
+        return StoredObject(bucket, path, public_url)
+
+    def upload(self, bucket: str, data: bytes, extension: str, content_type: str) -> StoredObject:
+        """
+        Store bytes in a bucket unless identical bytes are already there (blocking).
+
+        Returns:
+            The stored object; `reused` tells whether an existing one was returned
+        """
+        digest = content_hash(data)
+        existing = self.find(bucket, digest, len(data))
+        if existing:
+            return existing
+
+        path = content_path(digest, extension)
+        try:
+            supabase.storage.from_(bucket).upload(
+                file=data,
+                path=path,
+                file_options={"content-type": content_type}
+            )
+        except Exception as e:
+            # Uploaded before the index knew about it (e.g. another instance)
+            message = str(e).lower()
+            if "already exists" not in message and "duplicate" not in message:
+                raise
+        return self.record(bucket, digest, path, len(data))
+
+    def stats(self) -> dict:
+        with self._lock:
+            objects, stored_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM objects"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "name": "content_store",
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "bytes_saved": self.bytes_saved,
+            "objects": objects,
+            "stored_bytes": stored_bytes,
+        }
+
+
+content_store = ContentStore()
@@ -0,0 +1,107 @@
+"""
+Shrinks uploads before they are sent to the Gemini vision calls.
+
+Phone photos arrive at full resolution with EXIF metadata and are often rotated
+by an orientation tag only. Vision models gain nothing from that resolution, and
+every extra byte costs upload time and image tokens. Images are rotated upright,
+scaled to VISION_MAX_EDGE on the long side, stripped of metadata and re-encoded
+as JPEG or WebP at VISION_IMAGE_QUALITY.
+"""
+
+import io
+from dataclasses import dataclass
+from typing import Optional
+from PIL import Image, ImageOps
+from app.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+_FORMATS = {
+    "jpeg": ("JPEG", "image/jpeg"),
+    "webp": ("WEBP", "image/webp"),
+}
+
+
+@dataclass
+class PreprocessedImage:
+    """Image ready for a vision call, and what preprocessing saved"""
+    data: bytes
+    content_type: str
+    width: int
+    height: int
+    original_bytes: int
+
+    @property
+    def saved_bytes(self) -> int:
+        return max(self.original_bytes - len(self.data), 0)
+
+
+class ImagePreprocessor:
+    """Keeps totals across calls so savings can be reported"""
+
+    def __init__(self):
+        self.images = 0
+        self.failures = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def preprocess(self, image_bytes: bytes, original_content_type: Optional[str] = None) -> PreprocessedImage:
+        """
+        Orient, downscale, strip metadata and re-encode an image (blocking).
+
+        Args:
+            image_bytes: Uploaded image, any format PIL reads
+            original_content_type: The upload's content type, kept for the fallback
+
+        Returns:
+            The processed image. The original bytes are returned unchanged, with
+            their own content type, when PIL can't read them, so the vision call
+            still gets a chance.
+        """
+        image_format, content_type = _FORMATS.get(settings.vision_image_format.lower(), _FORMATS["jpeg"])
+        try:
+            with Image.open(io.BytesIO(image_bytes)) as original:
+                image = ImageOps.exif_transpose(original)
+                if image.mode not in ("RGB", "L"):
+                    # JPEG has no alpha, put transparent areas on white
+                    background = Image.new("RGB", image.size, (255, 255, 255))
+                    background.paste(image.convert("RGBA"), mask=image.convert("RGBA").getchannel("A"))
+                    image = background
+                if max(image.size) > settings.vision_max_edge:
+                    image.thumbnail((settings.vision_max_edge, settings.vision_max_edge), Image.LANCZOS)
+
+                buffer = io.BytesIO()
+                # No exif= argument, so no metadata is written
+                image.save(buffer, format=image_format, quality=settings.vision_image_quality, optimize=True)
+                data = buffer.getvalue()
+                width, height = image.size
+        except Exception as e:
+            self.failures += 1
+            logger.warning(f"Image preprocessing failed, using the original: {e}")
+            if not (original_content_type or "").startswith("image/"):
+                original_content_type = "image/jpeg"
+            return PreprocessedImage(image_bytes, original_content_type, 0, 0, len(image_bytes))
+
+        self.images += 1
+        self.bytes_in += len(image_bytes)
+        self.bytes_out += len(data)
+        processed = PreprocessedImage(data, content_type, width, height, len(image_bytes))
+        logger.info(
+            f"Image preprocessed to {width}x{height}: {len(image_bytes)} -> {len(data)} bytes "
+            f"({processed.saved_bytes} saved)"
+        )
+        return processed
+
+    def stats(self) -> dict:
+        return {
+            "name": "image_preprocessing",
+            "images": self.images,
+            "failures": self.failures,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "bytes_saved": max(self.bytes_in - self.bytes_out, 0),
+        }
+
+
+image_preprocessor = ImagePreprocessor()
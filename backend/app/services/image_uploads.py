@@ -0,0 +1,248 @@
+"""
+Background uploads of tool images to Supabase Storage.
+
+The chat and manual routes used to wait for the storage round trip before they
+could answer, although nothing in the answer depends on it. Uploads now start as
+background tasks next to recognition. Each image is first written to a SQLite
+outbox, so an upload that keeps failing (or a restart) doesn't lose it, and
+drain_periodically() retries what is left there.
+
+Rows that point at the image (scans.image_path, messages.image_url) are inserted
+without it and registered with attach(). They are filled in once the upload
+has finished.
+
+store() names images by content hash, so an image that is already in the bucket
+is not uploaded again.
+
+The outbox lives under settings.cache_dir. On hosts with an ephemeral disk
+(e.g. Render without a persistent disk) it only survives process restarts,
+not redeploys; mount cache_dir on a persistent disk to keep it across them.
+"""
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Set
+from app.config import settings, supabase
+from app.services.content_store import content_store, content_hash, content_path
+import logging
+
+logger = logging.getLogger(__name__)
+
+BUCKET = "tool-images"
+# Recently finished paths, checked before the content index in attach()
+DONE_MEMORY = 1024
+
+
+class ImageUploadOutbox:
+    """Uploads images in the background, with retries and a persistent outbox"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(settings.cache_dir, "uploads.sqlite3")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS uploads ("
+                "path TEXT PRIMARY KEY, content_type TEXT, data BLOB NOT NULL, "
+                "attempts INTEGER NOT NULL DEFAULT 0, next_attempt REAL NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS pending_links ("
+                "path TEXT NOT NULL, table_name TEXT NOT NULL, row_id TEXT NOT NULL, "
+                "column_name TEXT NOT NULL, public_url INTEGER NOT NULL)"
+            )
+            self._conn.commit()
+
+        self._tasks: Set[asyncio.Task] = set()
+        self._in_flight: Set[str] = set()
+        self._done: "OrderedDict[str, None]" = OrderedDict()
+        self.uploaded = 0
+        self.failed_attempts = 0
+        self.rows_filled = 0
+
+    def store(self, data: bytes, content_type: Optional[str], extension: str) -> str:
+        """
+        Content-addressed storage path of an image, uploaded in the background
+        unless the same bytes are already stored or on their way.
+        """
+        digest = content_hash(data)
+        existing = content_store.find(BUCKET, digest, len(data))
+        if existing:
+            with self._lock:
+                self._mark_done(existing.path)
+            return existing.path
+
+        path = content_path(digest, extension)
+        with self._lock:
+            uploading = path in self._in_flight
+        if not uploading:
+            self.submit(path, data, content_type)
+        return path
+
+    def submit(self, path: str, data: bytes, content_type: Optional[str]) -> asyncio.Task:
+        """Start uploading an image in the background and return right away"""
+        with self._lock:
+            self._in_flight.add(path)
+        task = asyncio.create_task(self._upload_with_retries(path, data, content_type))
+        # Keep a reference so the task is not garbage collected
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _upload_with_retries(self, path: str, data: bytes, content_type: Optional[str]):
+        try:
+            await asyncio.to_thread(self._save, path, data, content_type)
+            for attempt in range(settings.image_upload_attempts):
+                if attempt:
+                    await asyncio.sleep(settings.image_upload_retry_seconds * 2 ** (attempt - 1))
+                if await asyncio.to_thread(self._upload, path, data, content_type):
+                    return
+            logger.warning(f"Upload of {path} failed, left in the outbox")
+        except Exception as e:
+            logger.error(f"Background upload of {path} failed: {e}")
+        finally:
+            with self._lock:
+                self._in_flight.discard(path)
+
+    def _save(self, path: str, data: bytes, content_type: Optional[str]):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO uploads (path, content_type, data, attempts, next_attempt, created_at) "
+                "VALUES (?, ?, ?, 0, ?, ?)",
+                (path, content_type, data, now, now)
+            )
+            self._conn.commit()
+
+    def _upload(self, path: str, data: bytes, content_type: Optional[str]) -> bool:
+        """One upload attempt (blocking), True once the image is in storage"""
+        try:
+            supabase.storage.from_(BUCKET).upload(
+                file=data,
+                path=path,
+                file_options={"content-type": content_type or "image/jpeg"}
+            )
+        except Exception as e:
+            message = str(e).lower()
+            # An earlier attempt got through but its response was lost
+            if "already exists" not in message and "duplicate" not in message:
+                self.failed_attempts += 1
+                logger.warning(f"Image upload attempt for {path} failed: {e}")
+                with self._lock:
+                    self._conn.execute(
+                        "UPDATE uploads SET attempts = attempts + 1, next_attempt = ? WHERE path = ?",
+                        (time.time() + settings.image_upload_drain_seconds, path)
+                    )
+                    self._conn.commit()
+                return False
+
+        self.uploaded += 1
+        logger.info(f"Image uploaded to Supabase: {path}")
+        self._complete(path, data)
+        return True
+
+    def _mark_done(self, path: str):
+        self._done[path] = None
+        self._done.move_to_end(path)
+        if len(self._done) > DONE_MEMORY:
+            self._done.popitem(last=False)
+
+    def _complete(self, path: str, data: bytes):
+        content_store.record(BUCKET, content_hash(data), path, len(data))
+        with self._lock:
+            links = self._conn.execute(
+                "SELECT table_name, row_id, column_name, public_url FROM pending_links WHERE path = ?",
+                (path,)
+            ).fetchall()
+            self._conn.execute("DELETE FROM pending_links WHERE path = ?", (path,))
+            self._conn.execute("DELETE FROM uploads WHERE path = ?", (path,))
+            self._conn.commit()
+            self._mark_done(path)
+        for table_name, row_id, column_name, public_url in links:
+            self._fill(path, table_name, row_id, column_name, bool(public_url))
+
+    def _fill(self, path: str, table_name: str, row_id: str, column_name: str, public_url: bool):
+        value = supabase.storage.from_(BUCKET).get_public_url(path) if public_url else path
+        try:
+            supabase.table(table_name).update({column_name: value}).eq("id", row_id).execute()
+            self.rows_filled += 1
+        except Exception as e:
+            logger.error(f"Failed to set {table_name}.{column_name} for {row_id}: {e}")
+
+    def attach(self, path: str, table_name: str, row_id, column_name: str, public_url: bool = False):
+        """
+        Fill a row's column with the image once it is in storage (blocking).
+
+        Args:
+            path: Storage path passed to submit()
+            table_name, row_id, column_name: The row and column to update
+            public_url: Store the public URL instead of the storage path
+        """
+        with self._lock:
+            # _complete() records the object before taking the lock to collect
+            # links, so a link inserted here after a miss is still picked up
+            uploaded = path in self._done or content_store.contains(BUCKET, path)
+            if not uploaded:
+                self._conn.execute(
+                    "INSERT INTO pending_links (path, table_name, row_id, column_name, public_url) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (path, table_name, str(row_id), column_name, int(public_url))
+                )
+                self._conn.commit()
+        if uploaded:
+            self._fill(path, table_name, str(row_id), column_name, public_url)
+
+    def drain(self) -> int:
+        """Retry outbox uploads that are due and not already running (blocking)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, content_type, data FROM uploads WHERE next_attempt <= ? ORDER BY created_at",
+                (time.time(),)
+            ).fetchall()
+        uploaded = 0
+        for path, content_type, data in rows:
+            with self._lock:
+                if path in self._in_flight:
+                    continue
+                self._in_flight.add(path)
+            try:
+                uploaded += self._upload(path, data, content_type)
+            finally:
+                with self._lock:
+                    self._in_flight.discard(path)
+        if rows:
+            logger.info(f"Image outbox drained: {uploaded} of {len(rows)} uploads done")
+        return uploaded
+
+    async def drain_periodically(self):
+        """Retry failed uploads, run as a background task"""
+        while True:
+            try:
+                await asyncio.to_thread(self.drain)
+            except Exception as e:
+                logger.warning(f"Image outbox drain failed: {e}")
+            await asyncio.sleep(settings.image_upload_drain_seconds)
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = self._conn.execute("SELECT COUNT(*) FROM uploads").fetchone()[0]
+            pending_rows = self._conn.execute("SELECT COUNT(*) FROM pending_links").fetchone()[0]
+            in_flight = len(self._in_flight)
+        return {
+            "name": "image_uploads",
+            "uploaded": self.uploaded,
+            "failed_attempts": self.failed_attempts,
+            "in_flight": in_flight,
+            "outbox": pending,
+            "rows_filled": self.rows_filled,
+            "rows_waiting": pending_rows,
+        }
+
+
+image_uploads = ImageUploadOutbox()
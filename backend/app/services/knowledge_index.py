@@ -0,0 +1,421 @@
+"""
+Local retrieval over research and manuals we already produced.
+
+Every scan stores its research (scans.analysis_result) and every manual its text
+(manuals.manual_content). Both are cut into passages and kept in a BM25
+inverted index, grouped by tool name. Names are resolved to canonical tool IDs
+at query time, so passages follow alias table refreshes. Chat and the manual
+pipeline ask this index first and only go to Tavily when local recall is poor.
+
+The manual pipeline only uses web and video passages (RESEARCH_KINDS): a manual
+rebuilt from earlier manuals would never see fresh research again. Translated
+manual rows are not indexed.
+
+Passages are persisted in SQLite so a restart only reloads them. New rows are
+pulled from Supabase incrementally (by created_at), and results produced by this
+process are indexed immediately. At most KNOWLEDGE_MAX_PASSAGES are kept, the
+oldest are dropped first. Lookups and indexing block on SQLite and scoring, so
+async callers run them in a worker thread.
+"""
+
+import asyncio
+import hashlib
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter, defaultdict
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+from app.config import settings, supabase
+from app.model.schemas import ToolResearchResponse, ResearchResult, YouTubeLink
+from app.services.text_ranking import tokenize, BM25_K1, BM25_B
+from app.services.tool_canonicalizer import canonical_tool_id, tool_canonicalizer
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Longest passage; longer texts are split on paragraph boundaries
+PASSAGE_CHARS = 800
+# Rows pulled from each Supabase table per sync round
+SYNC_BATCH_SIZE = 500
+
+# What a manual needs to cover, used as the query for the manual pipeline
+MANUAL_TOPICS_QUERY = "overview use features safety steps tips mistakes maintenance storage"
+
+# Marks research responses assembled from the index instead of the web
+LOCAL_QUERY_PREFIX = "local index:"
+
+# Passage kinds that come from research, as opposed to our own manuals
+RESEARCH_KINDS = frozenset({"web", "video"})
+
+
+# Marks the canonical ID -> names mapping for a rebuild
+_STALE = object()
+
+
+def _tool_key(tool_name: str) -> str:
+    return " ".join(tool_name.lower().split())
+
+
+@dataclass
+class Passage:
+    """A retrievable chunk of stored research or manual text"""
+    tool_name: str
+    kind: str  # "web" | "video" | "manual"
+    title: str
+    url: str
+    text: str
+    score: float = 0.0
+
+
+@dataclass
+class LocalRecall:
+    """Top passages for a query and the share of query terms they cover"""
+    passages: List[Passage]
+    coverage: float
+
+    def is_sufficient(self, min_passages: int, min_coverage: float = None) -> bool:
+        min_coverage = settings.knowledge_min_coverage if min_coverage is None else min_coverage
+        return len(self.passages) >= min_passages and self.coverage >= min_coverage
+
+
+def _split_text(text: str) -> List[str]:
+    """Split text into passages of at most PASSAGE_CHARS, on paragraphs where possible"""
+    chunks = []
+    current = ""
+    for paragraph in re.split(r"\n\s*\n|\n(?=#)", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        while len(paragraph) > PASSAGE_CHARS:
+            cut = paragraph.rfind(" ", 0, PASSAGE_CHARS)
+            cut = cut if cut > PASSAGE_CHARS // 2 else PASSAGE_CHARS
+            chunks.append(paragraph[:cut].strip())
+            paragraph = paragraph[cut:].strip()
+        if current and len(current) + len(paragraph) + 2 > PASSAGE_CHARS:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _manual_passages(tool_name: str, manual: str) -> List[Passage]:
+    """One or more passages per manual section, titled after the section heading"""
+    passages = []
+    for section in re.split(r"\n(?=#{1,3}\s)", manual):
+        heading = re.match(r"#+\s*(.+)", section.strip())
+        title = f"{tool_name} manual: {heading.group(1).strip()}" if heading else f"{tool_name} manual"
+        for chunk in _split_text(section):
+            passages.append(Passage(tool_name, "manual", title, "", chunk))
+    return passages
+
+
+def _research_passages(tool_name: str, research: dict) -> List[Passage]:
+    if str(research.get("query", "")).startswith(LOCAL_QUERY_PREFIX):
+        # Assembled from this index, nothing new in it
+        return []
+    passages = []
+    for kind, field in (("web", "research_results"), ("video", "youtube_info")):
+        for item in research.get(field) or []:
+            for chunk in _split_text(item.get("content") or ""):
+                passages.append(Passage(tool_name, kind, item.get("title", ""), item.get("url", ""), chunk))
+    return passages
+
+
+class KnowledgeIndex:
+    """BM25 inverted index over passages, searchable per canonical tool"""
+
+    def __init__(self, path: Optional[str] = None, max_passages: Optional[int] = None):
+        self.path = path or os.path.join(settings.cache_dir, "knowledge.sqlite3")
+        self.max_passages = max_passages or settings.knowledge_max_passages
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS passages ("
+                "hash TEXT PRIMARY KEY, tool_name TEXT NOT NULL, kind TEXT NOT NULL, "
+                "title TEXT, url TEXT, text TEXT NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sync_state (source TEXT PRIMARY KEY, watermark TEXT NOT NULL)"
+            )
+            self._conn.commit()
+
+        # Indexed by passage ID; dropped passages leave None behind
+        self._passages: List[Optional[Passage]] = []
+        self._passage_hashes: List[str] = []
+        self._lengths: List[int] = []
+        self._total_length = 0
+        self._live = 0
+        self._oldest = 0
+        self._postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        # Stored tool name -> passages, and canonical ID -> stored names. The
+        # second is rebuilt whenever the alias table has been refreshed
+        self._by_tool: Dict[str, Set[int]] = defaultdict(set)
+        self._names_by_id: Dict[str, Set[str]] = defaultdict(set)
+        self._names_version = None
+        self._hashes: Set[str] = set()
+        self._loaded = False
+        self.local_hits = 0
+        self.web_fallbacks = 0
+
+    def _ensure_loaded(self):
+        with self._lock:
+            if self._loaded:
+                return
+            rows = self._conn.execute(
+                "SELECT hash, tool_name, kind, title, url, text FROM passages ORDER BY rowid"
+            ).fetchall()
+            for passage_hash, tool_name, kind, title, url, text in rows:
+                self._index(passage_hash, Passage(tool_name, kind, title or "", url or "", text))
+            self._evict()
+            self._conn.commit()
+            self._loaded = True
+            logger.info(f"Knowledge index loaded {len(rows)} passages")
+
+    def _index(self, passage_hash: str, passage: Passage):
+        passage_id = len(self._passages)
+        tokens = tokenize(f"{passage.title} {passage.text}")
+        self._passages.append(passage)
+        self._passage_hashes.append(passage_hash)
+        self._lengths.append(len(tokens))
+        self._total_length += len(tokens)
+        self._live += 1
+        for term, freq in Counter(tokens).items():
+            self._postings[term][passage_id] = freq
+        tool_key = _tool_key(passage.tool_name)
+        if tool_key not in self._by_tool and self._names_version == tool_canonicalizer.refreshed_at:
+            self._names_by_id[canonical_tool_id(tool_key)].add(tool_key)
+        self._by_tool[tool_key].add(passage_id)
+        self._hashes.add(passage_hash)
+
+    def _evict(self):
+        """Drop the oldest passages beyond max_passages, from memory and disk"""
+        dropped = []
+        while self._live > self.max_passages:
+            passage_id = self._oldest
+            self._oldest += 1
+            passage = self._passages[passage_id]
+            if passage is None:
+                continue
+            for term in set(tokenize(f"{passage.title} {passage.text}")):
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.pop(passage_id, None)
+                    if not postings:
+                        del self._postings[term]
+            tool_key = _tool_key(passage.tool_name)
+            self._by_tool[tool_key].discard(passage_id)
+            if not self._by_tool[tool_key]:
+                del self._by_tool[tool_key]
+                self._names_version = _STALE
+            self._total_length -= self._lengths[passage_id]
+            self._hashes.discard(self._passage_hashes[passage_id])
+            dropped.append((self._passage_hashes[passage_id],))
+            self._passages[passage_id] = None
+            self._live -= 1
+        if dropped:
+            self._conn.executemany("DELETE FROM passages WHERE hash = ?", dropped)
+
+    def _tool_passages(self, tool_name: str) -> Set[int]:
+        """Passages stored under any name that resolves to the tool's canonical ID"""
+        version = tool_canonicalizer.refreshed_at
+        if self._names_version != version:
+            self._names_by_id = defaultdict(set)
+            for tool_key in self._by_tool:
+                self._names_by_id[canonical_tool_id(tool_key)].add(tool_key)
+            self._names_version = version
+        passage_ids = set()
+        for tool_key in self._names_by_id.get(canonical_tool_id(tool_name), ()):
+            passage_ids |= self._by_tool.get(tool_key, set())
+        return passage_ids
+
+    def _add(self, passages: List[Passage]) -> int:
+        """Index and persist passages not seen before for their tool"""
+        self._ensure_loaded()
+        added = 0
+        with self._lock:
+            for passage in passages:
+                passage_hash = hashlib.sha1(
+                    f"{_tool_key(passage.tool_name)}|{passage.text}".encode("utf-8")
+                ).hexdigest()
+                if passage_hash in self._hashes:
+                    continue
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO passages (hash, tool_name, kind, title, url, text) VALUES (?, ?, ?, ?, ?, ?)",
+                    (passage_hash, passage.tool_name, passage.kind, passage.title, passage.url, passage.text)
+                )
+                self._index(passage_hash, passage)
+                added += 1
+            self._evict()
+            self._conn.commit()
+        return added
+
+    def add_research(self, tool_name: str, research) -> int:
+        """Index a research result (ToolResearchResponse or its JSON dump)"""
+        if isinstance(research, ToolResearchResponse):
+            research = research.model_dump(mode='json')
+        return self._add(_research_passages(tool_name, research or {}))
+
+    def add_manual(self, tool_name: str, manual: str) -> int:
+        return self._add(_manual_passages(tool_name, manual or ""))
+
+    def search(self, tool_name: str, query: str, k: int = 5, kinds: Optional[Set[str]] = None) -> LocalRecall:
+        """
+        Top-k passages about the tool for the query (blocking).
+
+        Args:
+            tool_name: Any spelling of the tool, resolved to its canonical ID
+            query: Question or topics to retrieve for
+            k: Maximum number of passages
+            kinds: Only consider these passage kinds (e.g. RESEARCH_KINDS), all by default
+
+        Returns:
+            LocalRecall with the passages (best first, each with its BM25 score)
+            and the share of query terms the passages contain
+        """
+        self._ensure_loaded()
+        query_terms = set(tokenize(query))
+        with self._lock:
+            candidates = self._tool_passages(tool_name)
+            if kinds is not None:
+                candidates = {pid for pid in candidates if self._passages[pid].kind in kinds}
+            if not candidates or not query_terms:
+                return LocalRecall([], 0.0)
+
+            n_docs = self._live
+            avg_length = self._total_length / n_docs or 1.0
+            scores = defaultdict(float)
+            for term in query_terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                # Walk whichever side is smaller
+                if len(postings) < len(candidates):
+                    matches = ((pid, tf) for pid, tf in postings.items() if pid in candidates)
+                else:
+                    matches = ((pid, postings[pid]) for pid in candidates if pid in postings)
+                for pid, tf in matches:
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[pid] / avg_length)
+                    scores[pid] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+            top = sorted(scores.items(), key=lambda item: -item[1])[:k]
+            covered = {
+                term for term in query_terms
+                if any(pid in self._postings.get(term, ()) for pid, _ in top)
+            }
+            passages = [
+                replace(self._passages[pid], score=round(score, 3))
+                for pid, score in top
+            ]
+        return LocalRecall(passages, len(covered) / len(query_terms))
+
+    def record_lookup(self, local: bool):
+        if local:
+            self.local_hits += 1
+        else:
+            self.web_fallbacks += 1
+
+    @staticmethod
+    def to_research_response(tool_name: str, query: str, recall: LocalRecall) -> ToolResearchResponse:
+        """Present local passages in the shape of perform_tool_research's output"""
+        best = max((p.score for p in recall.passages), default=0.0) or 1.0
+        research_results = []
+        youtube_info = []
+        for passage in recall.passages:
+            score = round(passage.score / best, 3)
+            if passage.kind == "video":
+                youtube_info.append(YouTubeLink(title=passage.title, url=passage.url, content=passage.text, score=score))
+            else:
+                research_results.append(ResearchResult(title=passage.title, url=passage.url, content=passage.text, score=score))
+        return ToolResearchResponse(
+            tool_name=tool_name,
+            query=f"{LOCAL_QUERY_PREFIX} {query}",
+            research_results=research_results,
+            youtube_info=youtube_info,
+            timestamp=datetime.now()
+        )
+
+    def _watermark(self, source: str) -> str:
+        with self._lock:
+            row = self._conn.execute("SELECT watermark FROM sync_state WHERE source = ?", (source,)).fetchone()
+        return row[0] if row else "1970-01-01T00:00:00"
+
+    def _set_watermark(self, source: str, watermark: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sync_state (source, watermark) VALUES (?, ?)", (source, watermark)
+            )
+            self._conn.commit()
+
+    def sync_from_supabase(self) -> int:
+        """Index scans and manuals created since the last sync (blocking)"""
+        self._ensure_loaded()
+        added = 0
+        sources = (
+            ("scans", "tool_name, analysis_result, created_at",
+             lambda row: self.add_research(row["tool_name"], row.get("analysis_result"))),
+            # Translations repeat the primary manual in another language
+            ("manuals", "tool_name, manual_content, translated_from, created_at",
+             lambda row: 0 if row.get("translated_from") else self.add_manual(row["tool_name"], row.get("manual_content"))),
+        )
+        for table, columns, index_row in sources:
+            watermark = self._watermark(table)
+            while True:
+                rows = (
+                    supabase.table(table)
+                    .select(columns)
+                    .gt("created_at", watermark)
+                    .order("created_at")
+                    .limit(SYNC_BATCH_SIZE)
+                    .execute()
+                ).data or []
+                for row in rows:
+                    if row.get("tool_name"):
+                        added += index_row(row)
+                if rows:
+                    watermark = rows[-1]["created_at"]
+                    self._set_watermark(table, watermark)
+                if len(rows) < SYNC_BATCH_SIZE:
+                    break
+        if added:
+            logger.info(f"Knowledge index synced {added} new passages")
+        return added
+
+    async def sync_periodically(self):
+        """Keep the index in step with Supabase, run as a background task"""
+        while True:
+            try:
+                await asyncio.to_thread(self.sync_from_supabase)
+            except Exception as e:
+                logger.warning(f"Knowledge index sync failed: {e}")
+            await asyncio.sleep(settings.knowledge_sync_seconds)
+
+    def stats(self) -> dict:
+        self._ensure_loaded()
+        with self._lock:
+            passages = self._live
+            tools = len(self._by_tool)
+            terms = len(self._postings)
+        lookups = self.local_hits + self.web_fallbacks
+        return {
+            "name": "knowledge",
+            "local_hits": self.local_hits,
+            "web_fallbacks": self.web_fallbacks,
+            "hit_rate": round(self.local_hits / lookups, 3) if lookups else 0.0,
+            "passages": passages,
+            "max_passages": self.max_passages,
+            "tools": tools,
+            "terms": terms,
+        }
+
+
+knowledge_index = KnowledgeIndex()
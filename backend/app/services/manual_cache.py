@@ -0,0 +1,64 @@
+from typing import Optional
+from app.config import settings
+from app.chains.tool_manual_chain import MANUAL_PROMPT_VERSION
+from app.services.cache import TieredCache, SQLiteCacheStore
+from app.services.tool_canonicalizer import canonical_tool_id
+
+
+class ManualCache:
+    """
+    Cache of generated manuals keyed on (canonical tool ID, language, prompt version).
+    A hit lets the pipeline skip research and both LLM calls.
+    """
+
+    def __init__(self):
+        self.cache = TieredCache(
+            name="manual",
+            max_size=settings.manual_cache_size,
+            ttl_seconds=settings.manual_cache_ttl,
+            store=SQLiteCacheStore("manual_cache")
+        )
+
+    @staticmethod
+    def make_key(tool_name: str, language: str) -> str:
+        return f"{canonical_tool_id(tool_name)}|{language.strip().lower()}|v{MANUAL_PROMPT_VERSION}"
+
+    def get(self, tool_name: str, language: str) -> Optional[dict]:
+        """
+        Returns the cached entry (tool_name, manual, summary, research, audio_files)
+        or None when missing or older than the TTL.
+        """
+        return self.cache.get(self.make_key(tool_name, language))
+
+    def set(
+        self,
+        tool_name: str,
+        language: str,
+        manual: str,
+        summary: str,
+        research: Optional[dict] = None,
+        audio_files: Optional[dict] = None
+    ):
+        self.cache.set(self.make_key(tool_name, language), {
+            "tool_name": tool_name,
+            "language": language,
+            "manual": manual,
+            "summary": summary,
+            "research": research,
+            "audio_files": audio_files,
+        })
+
+    def update_audio(self, tool_name: str, language: str, audio_files: dict):
+        """Attach audio to an existing entry so later hits can reuse it."""
+        key = self.make_key(tool_name, language)
+        entry = self.cache.get_entry(key)
+        if entry is not None:
+            entry.value["audio_files"] = audio_files
+            # Keep the original timestamp, the manual itself is not any fresher
+            self.cache.set(key, entry.value, stored_at=entry.stored_at)
+
+    def stats(self) -> dict:
+        return self.cache.stats()
+
+
+manual_cache = ManualCache()
@@ -0,0 +1,258 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import AsyncIterator, Callable, Dict, Optional, Tuple
+from fastapi import HTTPException
+from app.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Stages emitted by run_manual_pipeline, in order, used to report progress
+# Optional stages such as "translations" are reported but don't count towards progress
+PIPELINE_STAGES = ["recognized", "session", "research", "scan", "summary"]
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+FINISHED_STATUSES = {JOB_COMPLETED, JOB_FAILED, JOB_CANCELLED}
+
+
+class JobStore(ABC):
+    """Storage backend for manual generation jobs. Jobs are plain JSON-serializable dicts."""
+
+    @abstractmethod
+    def create(self, job: dict):
+        ...
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def update(self, job_id: str, **fields) -> Optional[dict]:
+        ...
+
+    def fail_unfinished(self, error: str) -> int:
+        """Mark jobs left queued or running by a previous process as failed"""
+        return 0
+
+
+class InMemoryJobStore(JobStore):
+    """Process-local job store. Oldest jobs are dropped past max_jobs."""
+
+    def __init__(self, max_jobs: int = 1000):
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, job: dict):
+        with self._lock:
+            self._jobs[job["id"]] = job
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def update(self, job_id: str, **fields) -> Optional[dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job.update(fields, updated_at=time.time())
+            return dict(job)
+
+
+class SQLiteJobStore(JobStore):
+    """
+    Job store backed by a local SQLite file. Finished jobs survive restarts of a
+    single instance; jobs that were still queued or running are failed on startup.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(settings.cache_dir, "manual_jobs.sqlite3")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS manual_jobs ("
+                "id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+
+    def create(self, job: dict):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO manual_jobs (id, data, updated_at) VALUES (?, ?, ?)",
+                (job["id"], json.dumps(job), job["updated_at"])
+            )
+            self._conn.commit()
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM manual_jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def update(self, job_id: str, **fields) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM manual_jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            job = json.loads(row[0])
+            job.update(fields, updated_at=time.time())
+            self._conn.execute(
+                "UPDATE manual_jobs SET data = ?, updated_at = ? WHERE id = ?",
+                (json.dumps(job), job["updated_at"], job_id)
+            )
+            self._conn.commit()
+        return job
+
+    def fail_unfinished(self, error: str) -> int:
+        with self._lock:
+            rows = self._conn.execute("SELECT id, data FROM manual_jobs").fetchall()
+            now = time.time()
+            failed = 0
+            for job_id, data in rows:
+                job = json.loads(data)
+                if job["status"] in FINISHED_STATUSES:
+                    continue
+                job.update(status=JOB_FAILED, error=error, updated_at=now)
+                self._conn.execute(
+                    "UPDATE manual_jobs SET data = ?, updated_at = ? WHERE id = ?",
+                    (json.dumps(job), now, job_id)
+                )
+                failed += 1
+            self._conn.commit()
+        return failed
+
+
+def create_job_store(backend: str) -> JobStore:
+    """Build the job store named by the MANUAL_JOB_STORE setting"""
+    if backend == "sqlite":
+        return SQLiteJobStore()
+    if backend == "memory":
+        return InMemoryJobStore()
+    raise ValueError(f"Unknown manual job store: {backend}")
+
+
+PipelineFactory = Callable[[], AsyncIterator[Tuple[str, dict]]]
+
+
+class ManualJobManager:
+    """
+    Runs manual generation pipelines as background jobs.
+
+    At most max_concurrency pipelines run at once; up to max_queued extra jobs
+    wait in the queued state, and submissions beyond that are rejected with 429
+    (queued jobs hold their uploaded image in memory). Progress is written to
+    the job store after every stage.
+    Jobs interrupted by a restart have no task left to finish them, so they
+    are marked failed when the manager starts.
+    """
+
+    def __init__(self, store: JobStore, max_concurrency: int, max_queued: int):
+        self.store = store
+        self.max_concurrency = max_concurrency
+        self.max_queued = max_queued
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._tasks: Dict[str, asyncio.Task] = {}
+        interrupted = self.store.fail_unfinished("Interrupted by a server restart, please submit the job again")
+        if interrupted:
+            logger.warning(f"Marked {interrupted} interrupted manual jobs as failed")
+
+    def ensure_capacity(self):
+        """Raise 429 when no more jobs can be queued"""
+        if len(self._tasks) >= self.max_concurrency + self.max_queued:
+            raise HTTPException(
+                status_code=429,
+                detail="Too many manual jobs are waiting, please try again later."
+            )
+
+    def submit(self, user_id: str, pipeline: PipelineFactory) -> dict:
+        """Register a job and schedule it. Must be called from the event loop."""
+        self.ensure_capacity()
+        now = time.time()
+        job = {
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "status": JOB_QUEUED,
+            "current_stage": None,
+            "stages": [],
+            "progress": 0.0,
+            "result": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        self.store.create(job)
+
+        task = asyncio.create_task(self._run(job["id"], pipeline))
+        self._tasks[job["id"]] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job["id"], None))
+        return job
+
+    def get(self, job_id: str) -> Optional[dict]:
+        return self.store.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[dict]:
+        """Cancel a queued or running job. Finished jobs are returned unchanged."""
+        job = self.store.get(job_id)
+        if job is None or job["status"] in FINISHED_STATUSES:
+            return job
+
+        task = self._tasks.get(job_id)
+        if task is not None:
+            task.cancel()
+        # The task also records this, but do it now so the caller sees the new status
+        return self.store.update(job_id, status=JOB_CANCELLED)
+
+    async def _run(self, job_id: str, pipeline: PipelineFactory):
+        stages = []
+        try:
+            async with self._semaphore:
+                self.store.update(job_id, status=JOB_RUNNING)
+                async for event, data in pipeline():
+                    if event == "stage":
+                        stages.append({"stage": data["stage"], "data": data, "completed_at": time.time()})
+                        self.store.update(
+                            job_id,
+                            current_stage=data["stage"],
+                            stages=stages,
+                            progress=round(
+                                sum(s["stage"] in PIPELINE_STAGES for s in stages) / (len(PIPELINE_STAGES) + 1), 2
+                            )
+                        )
+                    elif event == "result":
+                        self.store.update(job_id, status=JOB_COMPLETED, result=data, progress=1.0)
+        except asyncio.CancelledError:
+            logger.info(f"Manual job {job_id} cancelled")
+            self.store.update(job_id, status=JOB_CANCELLED)
+        except HTTPException as e:
+            logger.error(f"Manual job {job_id} failed: {e.detail}")
+            self.store.update(job_id, status=JOB_FAILED, error=str(e.detail))
+        except Exception as e:
+            logger.error(f"Manual job {job_id} failed: {str(e)}", exc_info=True)
+            self.store.update(job_id, status=JOB_FAILED, error=f"Manual generation error: {str(e)}")
+
+
+manual_job_manager = ManualJobManager(
+    store=create_job_store(settings.manual_job_store),
+    max_concurrency=settings.manual_job_concurrency,
+    max_queued=settings.manual_job_max_queued
+)
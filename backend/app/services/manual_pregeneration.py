@@ -0,0 +1,242 @@
+"""
+Batch pre-generation of manuals for the most-scanned tools.
+
+Reads tool-name frequency from the `scans` table (or takes an explicit list),
+researches each tool once and generates manual + summary for every configured
+language into manual_cache, the same store /api/generate-manual serves from.
+Progress is checkpointed to disk so an interrupted run resumes where it stopped.
+The checkpoint is cleared once a run completes, so later runs go by the cache
+alone and regenerate entries that have expired or been evicted.
+
+Run from the backend directory:
+    python -m app.services.manual_pregeneration --top 100 --languages en,fr,pdg
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import Counter, defaultdict
+from typing import List, Optional
+from app.config import settings, supabase, key_manager
+from app.chains.tool_manual_chain import tool_manual_chain
+from app.services.manual_cache import manual_cache
+from app.services.research_context import build_research_context
+from app.services.tavily_service import perform_tool_research
+from app.services.tool_canonicalizer import canonical_tool_id
+import logging
+
+logger = logging.getLogger(__name__)
+
+# How many recent scans to read when ranking tools by frequency
+SCAN_SAMPLE_SIZE = 5000
+
+
+class RateLimiter:
+    """Spaces out calls so they stay under a requests-per-minute budget."""
+
+    def __init__(self, requests_per_minute: float):
+        self.interval = 60.0 / requests_per_minute
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class PregenerationCheckpoint:
+    """Finished manual cache keys of the current run, persisted as JSON after every item."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(settings.cache_dir, "pregeneration_checkpoint.json")
+        self.done = set()
+        if os.path.exists(self.path):
+            try:
+                with open(self.path) as f:
+                    self.done = set(json.load(f).get("done", []))
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable pre-generation checkpoint: {e}")
+
+    def mark_done(self, key: str):
+        self.done.add(key)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"done": sorted(self.done), "updated_at": time.time()}, f)
+        os.replace(tmp_path, self.path)
+
+    def reset(self):
+        self.done = set()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def get_top_scanned_tools(limit: int) -> List[str]:
+    """
+    Most frequently scanned tools, most common first.
+    Variants with the same canonical tool ID are counted together and reported
+    under their most common spelling.
+    """
+    response = (
+        supabase.table("scans")
+        .select("tool_name")
+        .order("created_at", desc=True)
+        .limit(SCAN_SAMPLE_SIZE)
+        .execute()
+    )
+
+    counts = Counter()
+    spellings = defaultdict(Counter)
+    for row in response.data or []:
+        name = (row.get("tool_name") or "").strip()
+        if not name:
+            continue
+        key = canonical_tool_id(name)
+        counts[key] += 1
+        spellings[key][name] += 1
+
+    return [spellings[key].most_common(1)[0][0] for key, _ in counts.most_common(limit)]
+
+
+# Status of the last or current run, reported by the admin endpoint
+pregeneration_status = {"running": False, "report": None}
+
+
+async def pregenerate_manuals(
+    tool_names: Optional[List[str]] = None,
+    top_n: Optional[int] = None,
+    languages: Optional[List[str]] = None,
+    force: bool = False,
+    checkpoint: Optional[PregenerationCheckpoint] = None
+) -> dict:
+    """
+    Pre-generate manuals and summaries into manual_cache.
+
+    Args:
+        tool_names: Explicit tools to generate; defaults to the top scanned tools
+        top_n: Number of top scanned tools to use when tool_names is not given
+        languages: Languages to generate; defaults to PREGENERATE_LANGUAGES
+        force: Regenerate even when a fresh cache entry or checkpoint exists
+        checkpoint: Progress of an interrupted run to resume, the file-backed one
+            by default; it is reset when the run completes
+
+    Returns:
+        Report with generated, skipped and failed (tool, language) pairs
+    """
+    # Set before the first await so concurrent starts see the run
+    pregeneration_status.update(running=True, report=None)
+    try:
+        languages = languages or settings.pregenerate_languages_list
+        checkpoint = checkpoint or PregenerationCheckpoint()
+        if tool_names is None:
+            tool_names = await asyncio.to_thread(
+                get_top_scanned_tools, top_n or settings.pregenerate_top_n
+            )
+
+        # Every generation makes two Gemini calls; budget for the whole key pool
+        limiter = RateLimiter(
+            settings.pregenerate_rpm_per_key * max(len(key_manager.api_keys), 1)
+        )
+        report = {"tools": len(tool_names), "languages": languages, "generated": [], "skipped": [], "failed": []}
+        pregeneration_status["report"] = report
+        logger.info(f"Pre-generating manuals for {len(tool_names)} tools in {languages}")
+
+        for tool_name in tool_names:
+            pending = []
+            for language in languages:
+                key = manual_cache.make_key(tool_name, language)
+                if not force and (key in checkpoint.done or manual_cache.get(tool_name, language)):
+                    report["skipped"].append([tool_name, language])
+                    continue
+                pending.append((language, key))
+            if not pending:
+                continue
+
+            try:
+                # One research pass serves every language of this tool
+                research = await perform_tool_research(tool_name=tool_name, profile="manual-full")
+            except Exception as e:
+                logger.error(f"Research failed for {tool_name}: {e}")
+                report["failed"].extend([tool_name, language] for language, _ in pending)
+                continue
+
+            manual_context = build_research_context(research, settings.manual_context_tokens)
+            summary_context = build_research_context(research, settings.summary_context_tokens)
+
+            for language, key in pending:
+                try:
+                    await limiter.acquire()
+                    await limiter.acquire()
+                    manual, summary = await asyncio.gather(
+                        tool_manual_chain.agenerate_manual(
+                            tool_name=tool_name,
+                            research_context=manual_context.text,
+                            language=language
+                        ),
+                        tool_manual_chain.agenerate_quick_summary(
+                            tool_name=tool_name,
+                            research_context=summary_context.text,
+                            language=language
+                        )
+                    )
+                    if not manual or not summary or len(manual.strip()) < 5 or len(summary.strip()) < 5:
+                        raise ValueError("empty manual or summary")
+
+                    manual_cache.set(
+                        tool_name,
+                        language,
+                        manual=manual,
+                        summary=summary,
+                        research=research.model_dump(mode='json')
+                    )
+                    checkpoint.mark_done(key)
+                    report["generated"].append([tool_name, language])
+                    logger.info(f"Pre-generated manual for {tool_name} ({language})")
+                except Exception as e:
+                    logger.error(f"Pre-generation failed for {tool_name} ({language}): {e}")
+                    report["failed"].append([tool_name, language])
+
+        # Completed, nothing to resume; the next run decides from the cache alone
+        checkpoint.reset()
+    finally:
+        pregeneration_status["running"] = False
+
+    logger.info(
+        f"Pre-generation finished: {len(report['generated'])} generated, "
+        f"{len(report['skipped'])} skipped, {len(report['failed'])} failed"
+    )
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate manuals for the most-scanned tools.")
+    parser.add_argument("--top", type=int, default=settings.pregenerate_top_n, help="Number of top scanned tools")
+    parser.add_argument("--tools", help="Comma-separated tool names to use instead of scan frequency")
+    parser.add_argument("--languages", help="Comma-separated languages (default: PREGENERATE_LANGUAGES)")
+    parser.add_argument("--force", action="store_true", help="Regenerate cached and checkpointed manuals")
+    parser.add_argument("--reset-checkpoint", action="store_true", help="Forget the progress of an interrupted run")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    checkpoint = PregenerationCheckpoint()
+    if args.reset_checkpoint:
+        checkpoint.reset()
+
+    report = asyncio.run(pregenerate_manuals(
+        tool_names=[t.strip() for t in args.tools.split(",") if t.strip()] if args.tools else None,
+        top_n=args.top,
+        languages=[l.strip() for l in args.languages.split(",") if l.strip()] if args.languages else None,
+        force=args.force,
+        checkpoint=checkpoint
+    ))
+    print(json.dumps({k: (len(v) if isinstance(v, list) and k != "languages" else v) for k, v in report.items()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Near-duplicate detection for research results.
+
+Syndicated product blurbs and mirrored how-to pages differ only in a few words,
+so exact hashing misses them. Each text is split into overlapping word shingles
+and summarized by a MinHash signature. Locality-sensitive hashing over bands of
+the signature finds candidate pairs without comparing everything with
+everything, and the signature agreement estimates their Jaccard similarity.
+"""
+
+import hashlib
+import random
+import re
+from collections import defaultdict
+from typing import Callable, List, Sequence, Set, Tuple, TypeVar
+from app.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+SHINGLE_SIZE = 4
+NUM_PERMUTATIONS = 64
+# 16 bands of 4 rows: pairs above ~0.5 similarity almost always share a band
+LSH_BANDS = 16
+_ROWS_PER_BAND = NUM_PERMUTATIONS // LSH_BANDS
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(1)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERMUTATIONS)
+]
+
+
+def _shingles(text: str) -> Set[int]:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) <= SHINGLE_SIZE:
+        grams = [" ".join(words)] if words else []
+    else:
+        grams = [" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)]
+    return {
+        int.from_bytes(hashlib.blake2b(gram.encode("utf-8"), digest_size=8).digest(), "big")
+        for gram in grams
+    }
+
+
+def minhash_signature(text: str) -> Tuple[int, ...]:
+    """MinHash signature of the text's word shingles, empty for empty text"""
+    shingles = _shingles(text)
+    if not shingles:
+        return ()
+    return tuple(min((a * s + b) % _PRIME for s in shingles) for a, b in _PERMUTATIONS)
+
+
+def estimated_similarity(a: Tuple[int, ...], b: Tuple[int, ...]) -> float:
+    if not a or not b:
+        return 0.0
+    return sum(x == y for x, y in zip(a, b)) / NUM_PERMUTATIONS
+
+
+def remove_near_duplicates(
+    items: Sequence[T],
+    text: Callable[[T], str] = lambda item: item.content,
+    score: Callable[[T], float] = lambda item: item.score,
+    threshold: float = None
+) -> List[T]:
+    """
+    Collapse near-duplicate items, keeping the highest-scoring copy of each.
+
+    Args:
+        items: Research results, YouTube links or anything with text and a score
+        text: Returns the text compared for duplication
+        score: Returns the score deciding which copy survives
+        threshold: Estimated Jaccard similarity at which two texts count as
+            duplicates, RESEARCH_DEDUP_THRESHOLD by default
+
+    Returns:
+        The surviving items, in their original order
+    """
+    threshold = threshold or settings.research_dedup_threshold
+    buckets = defaultdict(list)
+    kept = []
+
+    for index in sorted(range(len(items)), key=lambda i: -score(items[i])):
+        signature = minhash_signature(text(items[index]))
+        bands = [
+            (band, signature[band * _ROWS_PER_BAND:(band + 1) * _ROWS_PER_BAND])
+            for band in range(LSH_BANDS)
+        ] if signature else []
+
+        # Only items sharing at least one band are compared
+        candidates = {}
+        for band in bands:
+            for other, other_signature in buckets[band]:
+                candidates[other] = other_signature
+        duplicate_of = next(
+            (
+                other for other, other_signature in candidates.items()
+                if estimated_similarity(signature, other_signature) >= threshold
+            ),
+            None
+        )
+        if duplicate_of is not None:
+            logger.info(f"Dropping near-duplicate research item {index} (duplicate of {duplicate_of})")
+            continue
+
+        kept.append(index)
+        for band in bands:
+            buckets[band].append((index, signature))
+
+    return [items[i] for i in sorted(kept)]
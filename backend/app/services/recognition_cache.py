@@ -0,0 +1,173 @@
+"""
+Perceptual-hash cache of image analysis results.
+
+A retried upload or the same photo picked again from the gallery is rarely
+byte-identical (re-encoding, resizing, cropping by the client), but it looks the
+same. Images are fingerprinted with a 64-bit difference hash (dHash), and a
+fingerprint within RECOGNITION_HASH_DISTANCE bits of a cached one reuses its
+analysis instead of calling the vision model. Lookups go through a BK-tree, so they
+don't scan every entry.
+"""
+
+import io
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+from PIL import Image, ImageOps
+from app.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+HASH_SIZE = 8
+
+
+def image_fingerprint(image_bytes: bytes) -> Optional[int]:
+    """64-bit dHash of an image, None when it can't be decoded (blocking)"""
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            # Let the JPEG decoder downscale while decoding, much faster on big photos
+            image.draft("L", (HASH_SIZE * 8, HASH_SIZE * 8))
+            image = ImageOps.exif_transpose(image)
+            pixels = list(
+                image.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.LANCZOS).getdata()
+            )
+    except Exception as e:
+        logger.warning(f"Could not fingerprint image: {e}")
+        return None
+
+    fingerprint = 0
+    for row in range(HASH_SIZE):
+        for col in range(HASH_SIZE):
+            left = pixels[row * (HASH_SIZE + 1) + col]
+            right = pixels[row * (HASH_SIZE + 1) + col + 1]
+            fingerprint = (fingerprint << 1) | (left > right)
+    return fingerprint
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class _BKNode:
+    __slots__ = ("fingerprint", "children")
+
+    def __init__(self, fingerprint: int):
+        self.fingerprint = fingerprint
+        self.children: Dict[int, "_BKNode"] = {}
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over fingerprints with Hamming distance.
+
+    Nodes can't be removed cheaply, so the owner skips fingerprints it no longer
+    holds and rebuilds the tree once they pile up.
+    """
+
+    def __init__(self):
+        self.root: Optional[_BKNode] = None
+        self.size = 0
+
+    def add(self, fingerprint: int):
+        self.size += 1
+        if self.root is None:
+            self.root = _BKNode(fingerprint)
+            return
+        node = self.root
+        while True:
+            distance = hamming_distance(fingerprint, node.fingerprint)
+            if distance == 0:
+                self.size -= 1
+                return
+            child = node.children.get(distance)
+            if child is None:
+                node.children[distance] = _BKNode(fingerprint)
+                return
+            node = child
+
+    def search(self, fingerprint: int, max_distance: int):
+        """Yield (distance, fingerprint) for every stored fingerprint within max_distance"""
+        stack = [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            distance = hamming_distance(fingerprint, node.fingerprint)
+            if distance <= max_distance:
+                yield distance, node.fingerprint
+            # Triangle inequality: only these subtrees can hold matches
+            for child_distance, child in node.children.items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    stack.append(child)
+
+
+@dataclass
+class _Recognition:
+    result: dict
+    stored_at: float
+
+
+class RecognitionCache:
+    """Fingerprint -> analysis result (JSON-able dict), with LRU size limit and TTL"""
+
+    def __init__(self, max_size: Optional[int] = None, ttl_seconds: Optional[int] = None, max_distance: Optional[int] = None):
+        self.max_size = max_size or settings.recognition_cache_size
+        self.ttl_seconds = ttl_seconds or settings.recognition_cache_ttl
+        self.max_distance = settings.recognition_hash_distance if max_distance is None else max_distance
+        self._entries: "OrderedDict[int, _Recognition]" = OrderedDict()
+        self._tree = BKTree()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, fingerprint: int) -> Optional[dict]:
+        """Result for the closest fresh cached image, if one is close enough"""
+        now = time.time()
+        best: Optional[Tuple[int, int]] = None
+        for distance, candidate in self._tree.search(fingerprint, self.max_distance):
+            entry = self._entries.get(candidate)
+            if entry is None:
+                continue
+            if now - entry.stored_at > self.ttl_seconds:
+                del self._entries[candidate]
+                continue
+            if best is None or distance < best[0]:
+                best = (distance, candidate)
+
+        if best is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(best[1])
+        logger.info(f"Recognition cache hit at distance {best[0]}")
+        return self._entries[best[1]].result
+
+    def set(self, fingerprint: int, result: dict):
+        if fingerprint not in self._entries:
+            self._tree.add(fingerprint)
+        self._entries[fingerprint] = _Recognition(result, time.time())
+        self._entries.move_to_end(fingerprint)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        # Evicted and expired fingerprints are still in the tree, drop them
+        if self._tree.size > 2 * len(self._entries) + 64:
+            self._rebuild()
+
+    def _rebuild(self):
+        tree = BKTree()
+        for fingerprint in self._entries:
+            tree.add(fingerprint)
+        self._tree = tree
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "name": "recognition",
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": len(self._entries),
+            "max_distance": self.max_distance,
+        }
+
+
+recognition_cache = RecognitionCache()
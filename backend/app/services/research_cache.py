@@ -0,0 +1,79 @@
+import asyncio
+from typing import Awaitable, Callable
+from app.config import settings
+from app.model.schemas import ToolResearchResponse
+from app.services.cache import TieredCache, SQLiteCacheStore
+from app.services.tool_canonicalizer import canonical_tool_id
+from app.services.single_flight import research_flight
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ResearchCache:
+    """
+    Cache of perform_tool_research results keyed on (canonical tool ID, language,
+    max_results, research profile).
+
+    Fresh entries are served directly. Entries past the TTL but inside the stale
+    window are served immediately while a background refresh replaces them
+    (stale-while-revalidate). Anything older is researched again; concurrent
+    misses for the same key share a single research call.
+    """
+
+    def __init__(self):
+        self.cache = TieredCache(
+            name="research",
+            max_size=settings.research_cache_size,
+            ttl_seconds=settings.research_cache_ttl,
+            store=SQLiteCacheStore("research_cache")
+        )
+        self.stale_seconds = settings.research_cache_stale_ttl
+        # Keys being refreshed, mapped to their task so it isn't garbage collected
+        self._refreshing = {}
+
+    @staticmethod
+    def make_key(tool_name: str, language: str, max_results: int, profile: str) -> str:
+        return f"{canonical_tool_id(tool_name)}|{language.strip().lower()}|{max_results}|{profile}"
+
+    async def get_or_research(
+        self,
+        key: str,
+        research: Callable[[], Awaitable[ToolResearchResponse]]
+    ) -> ToolResearchResponse:
+        """Serve key from the cache, calling research() on a miss and in the background when stale"""
+        value, state = self.cache.lookup(key, stale_seconds=self.stale_seconds)
+        if state == "fresh":
+            return ToolResearchResponse.model_validate(value)
+        if state == "stale":
+            self._refresh_in_background(key, research)
+            return ToolResearchResponse.model_validate(value)
+
+        async def research_and_store() -> ToolResearchResponse:
+            result = await research()
+            self.cache.set(key, result.model_dump(mode='json'))
+            return result
+
+        return await research_flight.run(key, research_and_store)
+
+    def _refresh_in_background(self, key: str, research: Callable[[], Awaitable[ToolResearchResponse]]):
+        if key in self._refreshing:
+            return
+
+        async def refresh():
+            try:
+                self.cache.set(key, (await research()).model_dump(mode='json'))
+                logger.info(f"Research cache refreshed: {key}")
+            except Exception as e:
+                # Keep serving the stale entry, the next lookup will try again
+                logger.warning(f"Research cache refresh failed for {key}: {e}")
+            finally:
+                self._refreshing.pop(key, None)
+
+        self._refreshing[key] = asyncio.create_task(refresh())
+
+    def stats(self) -> dict:
+        return self.cache.stats()
+
+
+research_cache = ResearchCache()
@@ -0,0 +1,144 @@
+"""
+Builds the research context passed to the manual and summary prompts.
+
+Research results are ranked by score, deduplicated, serialized as compact
+plain text and cut to a token budget per prompt type, instead of dumping the
+full indented JSON (URLs, scores, timestamps and whole transcripts).
+"""
+
+import hashlib
+import json
+import re
+from dataclasses import dataclass
+from typing import List
+from urllib.parse import urlparse
+from app.model.schemas import ToolResearchResponse
+
+# Rough average for English text with Gemini's tokenizer
+CHARS_PER_TOKEN = 4
+
+# No single source may take more than this share of the budget
+MAX_SNIPPET_SHARE = 0.4
+
+# Don't bother adding a truncated snippet shorter than this
+MIN_SNIPPET_TOKENS = 40
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+@dataclass
+class ResearchContext:
+    """Prompt-ready research text and how much it saved over the raw JSON dump"""
+    text: str
+    tokens: int
+    original_tokens: int
+    snippets_used: int
+    snippets_total: int
+
+    @property
+    def saved_tokens(self) -> int:
+        return max(self.original_tokens - self.tokens, 0)
+
+
+@dataclass
+class _Snippet:
+    kind: str
+    title: str
+    url: str
+    content: str
+    score: float
+
+
+def _collect_snippets(research: ToolResearchResponse) -> List[_Snippet]:
+    snippets = [
+        _Snippet("web", r.title, r.url, r.content, r.score)
+        for r in research.research_results
+    ]
+    snippets += [
+        _Snippet("video", y.title, y.url, y.content, y.score)
+        for y in research.youtube_info
+    ]
+    # Highest scoring first, web pages before videos on ties
+    snippets.sort(key=lambda s: (-s.score, s.kind != "web"))
+    return snippets
+
+
+def _dedupe(snippets: List[_Snippet]) -> List[_Snippet]:
+    seen_urls = set()
+    seen_content = set()
+    unique = []
+    for snippet in snippets:
+        url_key = snippet.url.split("#")[0].rstrip("/").lower()
+        content_key = hashlib.sha1(
+            re.sub(r"\W+", " ", snippet.content.lower()).strip().encode("utf-8")
+        ).hexdigest()
+        if url_key in seen_urls or content_key in seen_content:
+            continue
+        seen_urls.add(url_key)
+        seen_content.add(content_key)
+        unique.append(snippet)
+    return unique
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    # Prefer ending on a sentence or word boundary
+    boundary = max(cut.rfind(". "), cut.rfind("\n"))
+    if boundary < max_chars // 2:
+        boundary = cut.rfind(" ")
+    return cut[:boundary + 1].rstrip() + " …" if boundary > 0 else cut + " …"
+
+
+def _format_snippet(index: int, snippet: _Snippet, content: str) -> str:
+    if snippet.kind == "video":
+        source = snippet.url
+    else:
+        source = urlparse(snippet.url).netloc.replace("www.", "") or snippet.url
+    return f"[{index}] {snippet.title} ({snippet.kind}: {source})\n{content}"
+
+
+def build_research_context(research: ToolResearchResponse, token_budget: int) -> ResearchContext:
+    """
+    Rank, deduplicate and serialize research results within token_budget.
+
+    Args:
+        research: Output of perform_tool_research
+        token_budget: Maximum estimated tokens for the returned text
+
+    Returns:
+        ResearchContext with the prompt text and token accounting
+    """
+    original = json.dumps(research.model_dump(mode='json'), indent=2)
+    snippets = _dedupe(_collect_snippets(research))
+
+    max_snippet_tokens = max(int(token_budget * MAX_SNIPPET_SHARE), MIN_SNIPPET_TOKENS)
+    blocks = []
+    used = 0
+    for snippet in snippets:
+        content = " ".join(snippet.content.split())
+        if not content:
+            continue
+
+        header_tokens = estimate_tokens(_format_snippet(len(blocks) + 1, snippet, ""))
+        remaining = token_budget - used - header_tokens
+        if remaining < MIN_SNIPPET_TOKENS:
+            break
+
+        content = _truncate(content, min(remaining, max_snippet_tokens))
+        block = _format_snippet(len(blocks) + 1, snippet, content)
+        blocks.append(block)
+        used += estimate_tokens(block) + 1
+
+    text = "\n\n".join(blocks) if blocks else "No research results were found."
+    return ResearchContext(
+        text=text,
+        tokens=estimate_tokens(text),
+        original_tokens=estimate_tokens(original),
+        snippets_used=len(blocks),
+        snippets_total=len(research.research_results) + len(research.youtube_info)
+    )
@@ -0,0 +1,133 @@
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """One in-flight computation and everything its callers need to follow it."""
+
+    def __init__(self):
+        self.chunks: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+        self.task: Optional[asyncio.Task] = None
+        self.updated = asyncio.Event()
+
+    def notify(self):
+        # Wake everyone waiting on the current event and arm a new one
+        self.updated.set()
+        self.updated = asyncio.Event()
+
+
+class SingleFlight:
+    """
+    Request coalescing: concurrent calls with the same key share one computation.
+
+    The first caller for a key starts the work in its own task; callers arriving
+    while it runs join it and receive the same result (or exception). The work is
+    cancelled only when every caller has gone away, so one client disconnecting
+    does not fail the others. Nothing is kept once the work finishes, caching is
+    left to the caches.
+
+    run() coalesces a coroutine; stream() coalesces an async iterator, replaying
+    the chunks produced so far to late joiners before following live.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._flights: Dict[str, _Flight] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.failures = 0
+
+    def _join(self, key: str, produce: Callable[[_Flight], Awaitable[Any]]) -> _Flight:
+        self.calls += 1
+        flight = self._flights.get(key)
+        if flight is not None:
+            self.coalesced += 1
+            logger.info(f"{self.name}: coalesced call for {key} ({flight.waiters + 1} callers)")
+        else:
+            self.executions += 1
+            flight = _Flight()
+            self._flights[key] = flight
+            flight.task = asyncio.create_task(self._execute(key, flight, produce))
+            # Stream callers read the error from the flight, not from the task
+            flight.task.add_done_callback(lambda task: task.cancelled() or task.exception())
+        flight.waiters += 1
+        return flight
+
+    async def _execute(self, key: str, flight: _Flight, produce: Callable[[_Flight], Awaitable[Any]]):
+        try:
+            return await produce(flight)
+        except Exception as e:
+            self.failures += 1
+            flight.error = e
+            raise
+        finally:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            flight.done = True
+            flight.notify()
+
+    def _leave(self, key: str, flight: _Flight):
+        flight.waiters -= 1
+        if flight.waiters == 0 and not flight.task.done():
+            # Nobody is interested anymore, don't keep paying for the work
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            flight.task.cancel()
+
+    async def run(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Return func()'s result, sharing one call among concurrent callers with the same key"""
+        async def produce(flight: _Flight):
+            return await func()
+
+        flight = self._join(key, produce)
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            self._leave(key, flight)
+
+    async def stream(self, key: str, func: Callable[[], AsyncIterator[Any]]) -> AsyncIterator[Any]:
+        """Yield func()'s chunks, sharing one iteration among concurrent callers with the same key"""
+        async def produce(flight: _Flight):
+            async for chunk in func():
+                flight.chunks.append(chunk)
+                flight.notify()
+
+        flight = self._join(key, produce)
+        index = 0
+        try:
+            while True:
+                updated = flight.updated
+                while index < len(flight.chunks):
+                    yield flight.chunks[index]
+                    index += 1
+                if flight.done:
+                    break
+                await updated.wait()
+            if flight.error is not None:
+                raise flight.error
+        finally:
+            self._leave(key, flight)
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "coalesce_rate": round(self.coalesced / self.calls, 3) if self.calls else 0.0,
+            "failures": self.failures,
+            "in_flight": len(self._flights),
+        }
+
+
+research_flight = SingleFlight("research")
+recognition_flight = SingleFlight("recognition")
+manual_flight = SingleFlight("manual")
+tts_flight = SingleFlight("tts")
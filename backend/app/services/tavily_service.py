@@ -1,8 +1,24 @@
-from tavily import TavilyClient
+import asyncio
+import queue
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from tavily import AsyncTavilyClient
 from app.config import settings
 from app.model.schemas import ToolResearchResponse, ResearchResult, YouTubeLink
+from app.services.research_cache import research_cache
+from app.services.transcript_store import (
+    transcript_store,
+    TRANSCRIPT_DISABLED,
+    TRANSCRIPT_NOT_FOUND,
+    TRANSCRIPT_UNAVAILABLE
+)
+from app.services.transcript_extractor import extract_relevant_excerpts, format_excerpts
+from app.services.near_duplicates import remove_near_duplicates
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 import re
 from youtube_transcript_api import YouTubeTranscriptApi
 from youtube_transcript_api._errors import (
@@ -12,15 +28,84 @@ from youtube_transcript_api._errors import (
 )
 
 
+TAVILY_API_URL = "https://api.tavily.com"
+
+
+@dataclass(frozen=True)
+class ResearchProfile:
+    """How much research a call site pays for"""
+    name: str
+    search_depth: str  # Tavily search depth: "basic" | "advanced"
+    max_results: int
+    include_youtube: bool
+    fetch_transcripts: bool
+    youtube_results: int = 3
+
+
+RESEARCH_PROFILES = {
+    # A few quick web results, enough to ground a chat answer
+    "chat-light": ResearchProfile(
+        name="chat-light",
+        search_depth="basic",
+        max_results=3,
+        include_youtube=False,
+        fetch_transcripts=False
+    ),
+    # Everything the manual uses: advanced web search, YouTube and transcripts
+    "manual-full": ResearchProfile(
+        name="manual-full",
+        search_depth="advanced",
+        max_results=5,
+        include_youtube=True,
+        fetch_transcripts=True
+    ),
+}
+DEFAULT_RESEARCH_PROFILE = "manual-full"
+
+
 class TavilyService:
+    """
+    Async Tavily client. Every search goes through one pooled HTTP/1.1 client with
+    keep-alive, so concurrent research requests reuse connections instead of each
+    opening its own. The pool is created on first use and released by close().
+    """
+
     def __init__(self):
-        self.client = TavilyClient(api_key=settings.tavily_api_key)
-    
-    def search_tool_info(self, query: str, max_results: int):
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._client: Optional[AsyncTavilyClient] = None
+
+    @property
+    def client(self) -> AsyncTavilyClient:
+        if self._client is None:
+            self._http_client = httpx.AsyncClient(
+                base_url=TAVILY_API_URL,
+                http1=True,
+                http2=False,  # See HTTPX_NO_HTTP2 in main.py
+                limits=httpx.Limits(
+                    max_connections=settings.research_http_max_connections,
+                    max_keepalive_connections=settings.research_http_max_connections,
+                    keepalive_expiry=settings.research_http_keepalive
+                ),
+                timeout=httpx.Timeout(
+                    settings.research_search_timeout,
+                    connect=settings.research_http_connect_timeout
+                )
+            )
+            self._client = AsyncTavilyClient(api_key=settings.tavily_api_key, client=self._http_client)
+        return self._client
+
+    async def close(self):
+        """Close the pooled connections"""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+            self._client = None
+
+    async def search_tool_info(self, query: str, max_results: int, search_depth: str = "advanced"):
         try:
-            response = self.client.search(
+            response = await self.client.search(
                 query=f"{query} tool usage guide tutorial",
-                search_depth="advanced",
+                search_depth=search_depth,
                 max_results=max_results,
                 include_domains=[
                     "wikihow.com",
@@ -31,19 +116,21 @@ class TavilyService:
                     "toolguyd.com",
                     "familyhandyman.com",
                     "thisoldhouse.com"
-                ]
+                ],
+                timeout=settings.research_search_timeout
             )
             return response
         except Exception as e:
             raise Exception(f"Tool search error: {str(e)}")
     
-    def search_youtube_tutorials(self, query: str, max_results: int):
+    async def search_youtube_tutorials(self, query: str, max_results: int, search_depth: str = "advanced"):
         try:
-            response = self.client.search(
+            response = await self.client.search(
                 query=f"{query} how to use tutorial",
-                search_depth="advanced",
+                search_depth=search_depth,
                 max_results=max_results,
-                include_domains=["youtube.com", "youtu.be"]
+                include_domains=["youtube.com", "youtu.be"],
+                timeout=settings.research_search_timeout
             )
             return response
         except Exception as e:
@@ -112,111 +199,289 @@ class YoutubeTranscript:
         return None
 
     @staticmethod
-    def fetch_transcript(video_id: str, language: str = "en") -> Optional[str]:
+    def fetch_transcript_segments(video_id: str, language: str = "en") -> Optional[List[dict]]:
         """
-        Fetches the transcript for a YouTube video.
-        Uses the instance-based approach as seen in backend/test-yt.py.
+        Fetches the timed transcript segments for a YouTube video.
+        Served from the local transcript store when possible; videos without a
+        transcript are remembered there too, so they are not retried every time.
         
         Args:
             video_id: YouTube video ID
             language: Language code for transcript (default: "en")
             
         Returns:
-            Transcript as plain text, or None if unavailable
+            List of {'text', 'start', 'duration'} dicts, or None if unavailable
         """
+        stored = transcript_store.get(video_id, language)
+        if stored is not None:
+            return stored.segments if stored.available else None
+
         try:
-            # Create API instance as in test-yt.py
-            api = YouTubeTranscriptApi()
-            
-            # Use fetch method as in test-yt.py
-            fetched_transcript = api.fetch(video_id, languages=[language])
+            # Pooled API instance, keeps its connections to YouTube alive between fetches
+            with _transcript_clients.checkout() as api:
+                fetched_transcript = api.fetch(video_id, languages=[language])
             
             # Convert to raw data (list of dicts with 'text', 'start', 'duration')
             transcript_data = fetched_transcript.to_raw_data()
-            
-            # Join all transcript segments into plain text
-            plain_text = " ".join([segment['text'] for segment in transcript_data])
-            
-            return plain_text
+            transcript_store.put(video_id, language, transcript_data)
+            return transcript_data
         
         except TranscriptsDisabled:
             print(f"Transcripts are disabled for video ID: {video_id}")
+            transcript_store.put_negative(video_id, language, TRANSCRIPT_DISABLED)
             return None
         
         except NoTranscriptFound:
             print(f"No {language} transcript found for video ID: {video_id}")
+            transcript_store.put_negative(video_id, language, TRANSCRIPT_NOT_FOUND)
             return None
         
         except VideoUnavailable:
             print(f"Video unavailable for video ID: {video_id}")
+            transcript_store.put_negative(video_id, language, TRANSCRIPT_UNAVAILABLE)
             return None
         
         except Exception as e:
+            # Possibly transient (network, rate limit), so not remembered
             print(f"Error fetching transcript for video ID {video_id}: {str(e)}")
             return None
 
+    @staticmethod
+    def fetch_transcript(video_id: str, language: str = "en") -> Optional[str]:
+        """
+        Fetches the transcript for a YouTube video.
+        
+        Args:
+            video_id: YouTube video ID
+            language: Language code for transcript (default: "en")
+            
+        Returns:
+            Transcript as plain text, or None if unavailable
+        """
+        segments = YoutubeTranscript.fetch_transcript_segments(video_id, language=language)
+        if not segments:
+            return None
+        
+        # Join all transcript segments into plain text
+        return " ".join([segment['text'] for segment in segments])
+
+
+class _TimeoutSession(requests.Session):
+    """requests.Session with a default timeout, youtube_transcript_api doesn't pass one"""
+
+    def __init__(self, timeout):
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().request(method, url, **kwargs)
+
+
+class TranscriptClientPool:
+    """
+    Fixed pool of YouTubeTranscriptApi instances, each with its own keep-alive
+    requests.Session. youtube_transcript_api is synchronous and an instance is not
+    thread-safe, so fetches run in worker threads and check an instance out.
+
+    asyncio.wait_for can't stop a worker thread, so an abandoned fetch keeps its
+    instance until its request returns. Every request has a timeout, so that
+    always happens, and a checkout gives up after checkout_timeout instead of
+    blocking a shared executor thread while the pool is empty.
+    """
+
+    def __init__(self, size: int, request_timeout, checkout_timeout: float):
+        self.checkout_timeout = checkout_timeout
+        self._clients: "queue.Queue[YouTubeTranscriptApi]" = queue.Queue()
+        self._sessions: List[requests.Session] = []
+        for _ in range(size):
+            session = _TimeoutSession(request_timeout)
+            adapter = HTTPAdapter(pool_connections=2, pool_maxsize=2)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            self._sessions.append(session)
+            self._clients.put(YouTubeTranscriptApi(http_client=session))
+
+    @contextmanager
+    def checkout(self):
+        try:
+            api = self._clients.get(timeout=self.checkout_timeout)
+        except queue.Empty:
+            raise Exception(f"No transcript client free after {self.checkout_timeout}s")
+        try:
+            yield api
+        finally:
+            self._clients.put(api)
+
+    def close(self):
+        for session in self._sessions:
+            session.close()
+
 
 tavily_service = TavilyService()
 youtube_transcript = YoutubeTranscript()
+# Sized like the semaphore below. A fetch only waits for an instance while a
+# timed-out fetch still holds one, and then at most one transcript timeout
+_transcript_clients = TranscriptClientPool(
+    settings.transcript_concurrency,
+    request_timeout=(settings.research_http_connect_timeout, settings.transcript_timeout),
+    checkout_timeout=settings.transcript_timeout
+)
 
 
-def perform_tool_research(
+async def close_research_clients():
+    """Release pooled research connections, called on application shutdown"""
+    await tavily_service.close()
+    _transcript_clients.close()
+
+
+# Shared across requests so concurrent research can't flood YouTube
+_transcript_semaphore = asyncio.Semaphore(settings.transcript_concurrency)
+
+
+async def _with_timeout(coro, timeout: float):
+    """Await a client call, giving up after timeout seconds."""
+    try:
+        return await asyncio.wait_for(coro, timeout=timeout)
+    except asyncio.TimeoutError:
+        raise Exception(f"{coro.__qualname__} timed out after {timeout}s")
+
+
+async def _call_with_timeout(func, timeout: float, *args, **kwargs):
+    """Run a blocking client call in a worker thread, giving up after timeout seconds."""
+    try:
+        return await asyncio.wait_for(asyncio.to_thread(func, *args, **kwargs), timeout=timeout)
+    except asyncio.TimeoutError:
+        raise Exception(f"{func.__name__} timed out after {timeout}s")
+
+
+async def perform_tool_research(
     tool_name: str,
     tool_description: Optional[str] = None,
     language: str = "en",
-    max_results: int = 5
+    max_results: Optional[int] = None,
+    profile: str = DEFAULT_RESEARCH_PROFILE
 ) -> ToolResearchResponse:
     """
     Performs tool research using Tavily service.
     For YouTube videos, fetches transcripts and replaces the content field.
+    Results are served from research_cache when the same tool was researched recently.
+
+    profile picks how much work is done (see RESEARCH_PROFILES): "chat-light" for a
+    few basic web results, "manual-full" for the full research a manual needs.
+    max_results overrides the profile's number of web results.
     """
-    general_query = f"{tool_name} tool usage guide tutorial"
-    raw_results = tavily_service.search_tool_info(
-        query=general_query,
-        max_results=max_results
+    if profile not in RESEARCH_PROFILES:
+        raise ValueError(f"Unknown research profile: {profile}")
+    research_profile = RESEARCH_PROFILES[profile]
+    if max_results is not None:
+        research_profile = replace(research_profile, max_results=max_results)
+
+    return await research_cache.get_or_research(
+        research_cache.make_key(tool_name, language, research_profile.max_results, research_profile.name),
+        lambda: _research_tool(tool_name, language=language, profile=research_profile)
     )
-    
+
+
+async def _fetch_youtube_link(result: dict, tool_name: str, language: str, fetch_transcript: bool = True) -> YouTubeLink:
+    """Build a YouTubeLink, replacing Tavily's snippet with the relevant transcript excerpts when available."""
+    # Extract video ID from URL using YoutubeTranscript class
+    video_id = youtube_transcript.extract_video_id(result["url"])
+
+    content = result['content']  # Default to Tavily's content
+    excerpts = []
+    if video_id and fetch_transcript:
+        async with _transcript_semaphore:
+            try:
+                segments = await _call_with_timeout(
+                    youtube_transcript.fetch_transcript_segments,
+                    settings.transcript_timeout,
+                    video_id,
+                    language=language
+                )
+            except Exception as e:
+                print(f"Transcript fetch failed for video ID {video_id}: {e}")
+                segments = None
+        if segments:
+            excerpts = extract_relevant_excerpts(video_id, segments, tool_name)
+        if excerpts:
+            content = format_excerpts(excerpts)
+
+    return YouTubeLink(
+        title=result["title"],
+        url=result["url"],
+        content=content,
+        score=result.get("score", 0.0),
+        excerpts=excerpts
+    )
+
+
+async def _research_tool(
+    tool_name: str,
+    language: str = "en",
+    profile: ResearchProfile = RESEARCH_PROFILES[DEFAULT_RESEARCH_PROFILE]
+) -> ToolResearchResponse:
+    """
+    Uncached research: Tavily searches plus YouTube transcripts, as far as the profile asks.
+
+    The general and YouTube searches run in parallel, and transcript fetches start
+    as soon as the YouTube results arrive, so latency is set by the slowest single
+    chain of calls rather than the sum of all of them.
+    """
+    general_query = f"{tool_name} tool usage guide tutorial"
     youtube_query = f"{tool_name} how to use tutorial"
-    try:
-        youtube_results = tavily_service.search_youtube_tutorials(
-            query=youtube_query,
-            max_results=3
+
+    async def search_general():
+        return await _with_timeout(
+            tavily_service.search_tool_info(
+                query=general_query,
+                max_results=profile.max_results,
+                search_depth=profile.search_depth
+            ),
+            settings.research_search_timeout
         )
-    except Exception as e:
-        print(f"YouTube search failed: {e}")
-        youtube_results = {"results": []}
-    
-    formatted_general = tavily_service.format_results(raw_results)
-    formatted_youtube = tavily_service.format_results(
-        raw_results=youtube_results, 
-        tool_name=tool_name, 
-        youtube_only=True,
-        score_threshold=0.5  # Lower threshold for YouTube videos
-    )
-    
-    # Process YouTube links and fetch transcripts
-    youtube_links = []
-    for r in formatted_youtube:
-        if "youtube.com" in r["url"] or "youtu.be" in r["url"]:
-            # Extract video ID from URL using YoutubeTranscript class
-            video_id = youtube_transcript.extract_video_id(r["url"])
-            
-            # Fetch transcript if video ID was found
-            transcript_content = r['content']  # Default to Tavily's content
-            if video_id:
-                transcript = youtube_transcript.fetch_transcript(video_id, language=language)
-                if transcript:
-                    transcript_content = transcript  # Replace with transcript
-            
-            youtube_links.append(
-                YouTubeLink(
-                    title=r["title"], 
-                    url=r["url"], 
-                    content=transcript_content,  # Use transcript or fallback to Tavily content
-                    score=r.get("score", 0.0)
-                )
+
+    async def search_youtube_with_transcripts():
+        if not profile.include_youtube:
+            return []
+        try:
+            youtube_results = await _with_timeout(
+                tavily_service.search_youtube_tutorials(
+                    query=youtube_query,
+                    max_results=profile.youtube_results,
+                    search_depth=profile.search_depth
+                ),
+                settings.research_search_timeout
             )
-    
+        except Exception as e:
+            print(f"YouTube search failed: {e}")
+            youtube_results = {"results": []}
+
+        formatted_youtube = tavily_service.format_results(
+            raw_results=youtube_results,
+            tool_name=tool_name,
+            youtube_only=True,
+            score_threshold=0.5  # Lower threshold for YouTube videos
+        )
+
+        # Process YouTube links and fetch transcripts concurrently
+        return await asyncio.gather(*(
+            _fetch_youtube_link(r, tool_name, language, fetch_transcript=profile.fetch_transcripts)
+            for r in formatted_youtube
+            if "youtube.com" in r["url"] or "youtu.be" in r["url"]
+        ))
+
+    youtube_task = asyncio.create_task(search_youtube_with_transcripts())
+    try:
+        raw_results = await search_general()
+        youtube_links = list(await youtube_task)
+    finally:
+        if not youtube_task.done():
+            youtube_task.cancel()
+
+    formatted_general = tavily_service.format_results(raw_results)
+
     research_results = [
         ResearchResult(
             title=r["title"],
@@ -226,6 +491,10 @@ def perform_tool_research(
         )
         for r in formatted_general
     ]
+
+    # Syndicated and mirrored pages add tokens but no information
+    research_results = remove_near_duplicates(research_results)
+    youtube_links = remove_near_duplicates(youtube_links)
     
     return ToolResearchResponse(
         tool_name=tool_name,
@@ -233,4 +502,4 @@ def perform_tool_research(
         research_results=research_results,
         youtube_info=youtube_links,
         timestamp=datetime.now()
-    )
\ No newline at end of file
+    )
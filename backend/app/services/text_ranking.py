@@ -0,0 +1,68 @@
+"""
+Small lexical ranking helpers (tokenizer and BM25) shared by the services
+that score text against a tool name or a question.
+"""
+
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Sequence
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "do", "for", "from", "go",
+    "gonna", "got", "has", "have", "he", "her", "his", "how", "i", "if", "in", "into",
+    "is", "it", "its", "just", "like", "me", "my", "no", "not", "now", "of", "on", "or",
+    "our", "really", "so", "that", "the", "their", "them", "then", "there", "these",
+    "they", "this", "to", "uh", "um", "up", "was", "we", "what", "when", "which", "will",
+    "with", "you", "your", "yeah", "okay", "ok", "right", "well", "can", "all", "get",
+}
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords, with a light plural strip."""
+    tokens = []
+    for token in re.findall(r"[a-z0-9]+", text.lower()):
+        if token in STOPWORDS or len(token) < 2:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def bm25_scores(
+    documents: Sequence[List[str]],
+    query_weights: Dict[str, float]
+) -> List[float]:
+    """
+    BM25 score of every tokenized document for a weighted bag of query terms.
+
+    Args:
+        documents: Token lists, e.g. from tokenize()
+        query_weights: Query term -> weight (1.0 for a plain query term)
+
+    Returns:
+        One score per document, in input order
+    """
+    if not documents:
+        return []
+    n_docs = len(documents)
+    avg_len = sum(len(doc) for doc in documents) / n_docs or 1.0
+    doc_freq = Counter(term for doc in documents for term in set(doc))
+
+    scores = []
+    for doc in documents:
+        tf = Counter(doc)
+        length_norm = BM25_K1 * (1 - BM25_B + BM25_B * len(doc) / avg_len)
+        score = 0.0
+        for term, weight in query_weights.items():
+            freq = tf.get(term)
+            if not freq:
+                continue
+            idf = math.log(1 + (n_docs - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+            score += weight * idf * freq * (BM25_K1 + 1) / (freq + length_norm)
+        scores.append(score)
+    return scores
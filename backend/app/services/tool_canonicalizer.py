@@ -0,0 +1,342 @@
+"""
+Tool-name canonicalization.
+
+Recognition returns free-form names ("16 oz Claw Hammer", "claw hammer",
+"Hammer (claw)"), so everything keyed on the raw name rarely matches. Names are
+normalized (case, units and sizes, punctuation, parentheticals, plurals, word
+order) into a signature. Model numbers ("Dremel 3000") stay in it, and a name
+that is nothing but sizes or numbers ("18V", "5-in-1") is its own signature, so
+different products never share an ID. An alias table built from the `scans` history maps
+signatures to a canonical tool ID. Names not in the table are matched to it
+only when they are a typo-level variant of a known signature: the same number
+of tokens, each within a small edit distance of its counterpart. Trigram
+similarity just picks the candidates. "Cordless Hammer Drill" and "Cordless
+Drill" are different tools and never share an ID.
+
+Caches, pre-generation and analytics key on canonical_tool_id().
+"""
+
+import asyncio
+import re
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+from app.config import settings, supabase
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Sizes, weights, voltages... e.g. 16 oz, 18v, 1/2", 3.5 mm, 20-piece
+_UNIT_PATTERN = re.compile(
+    r"\b\d+(?:[.,/]\d+)?\s*-?\s*(?:oz|ounces?|lbs?|pounds?|kg|g|mm|cm|m|in|inch|inches|ft|foot|feet"
+    r"|v|volts?|w|watts?|amps?|ah|rpm|psi|pcs?|pieces?|gal|gallons?|l|ml|tpi)\b"
+)
+_INCH_PATTERN = re.compile(r"\b\d+(?:[.,/]\d+)?\s*(?:\"|''|”|″)")
+_NOISE_WORDS = {
+    "a", "an", "the", "of", "for", "with", "and", "likely", "possibly", "probably", "maybe",
+    "some", "kind", "type", "style", "standard", "generic", "common", "basic",
+}
+# Don't turn "glass" into "glas"
+_KEEP_S_SUFFIXES = ("ss", "us", "is")
+
+# Unseen names learned at runtime, on top of the table loaded from scans
+MAX_LEARNED_ALIASES = 10000
+# Resolved raw names remembered to skip normalization and fuzzy search
+RESOLVE_MEMO_SIZE = 4096
+
+
+def _singular(token: str) -> str:
+    if len(token) <= 3 or not token.endswith("s") or token.endswith(_KEEP_S_SUFFIXES):
+        return token
+    if token.endswith(("ches", "shes", "xes", "sses")):
+        return token[:-2]
+    return token[:-1]
+
+
+def normalize_tool_text(tool_name: str) -> List[str]:
+    """
+    Normalized tokens of a tool name, in their original order. A bare number is
+    a model number, and kept, when it follows a word ("Dremel 3000") or has three
+    or more digits ("3M 6200"); otherwise it is a count ("2 claw hammers").
+    """
+    text = tool_name.lower()
+    text = _INCH_PATTERN.sub(" ", text)
+    text = _UNIT_PATTERN.sub(" ", text)
+    # Parentheticals are qualifiers ("Hammer (claw)"), keep their words
+    text = re.sub(r"[^\w\s]|_", " ", text)
+    tokens = []
+    for token in text.split():
+        if token in _NOISE_WORDS:
+            continue
+        if token.isdigit() and not tokens and len(token) < 3:
+            continue
+        token = _singular(token)
+        if token not in tokens:
+            tokens.append(token)
+    return tokens
+
+
+def tool_signature(tool_name: str) -> str:
+    """Order-independent form of a name: "Hammer (claw)" and "claw hammer" match"""
+    tokens = normalize_tool_text(tool_name)
+    if not all(token.isdigit() for token in tokens):
+        return " ".join(sorted(tokens))
+    # Only sizes and model numbers ("18V", "5-in-1", "3M 6200", where 3M reads as
+    # a size): the name's own words, in order
+    return " ".join(re.sub(r"[^\w]+|_", " ", tool_name.lower()).split())
+
+
+def _trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _similarity(a: Set[str], b: Set[str]) -> float:
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance, stopping early once it exceeds limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def _token_typo_limit(token: str) -> int:
+    # Model numbers (m18, 20v, 2x4) and short words (band/hand saw) must match exactly
+    if len(token) <= 4 or any(c.isdigit() for c in token):
+        return 0
+    return 1 if len(token) <= 8 else 2
+
+
+def _is_token_typo(token: str, other: str) -> bool:
+    limit = min(_token_typo_limit(token), _token_typo_limit(other))
+    if limit == 0 or token[0] != other[0]:
+        return token == other
+    return _edit_distance(token, other, limit) <= limit
+
+
+def is_typo_variant(signature: str, other: str) -> bool:
+    """
+    True when two signatures name the same tool up to spelling: the same number
+    of tokens, each pairing with a token of the other that starts with the same
+    letter and is within its typo limit. An extra or different word is never a typo.
+    """
+    tokens, others = signature.split(), other.split()
+    if not tokens or len(tokens) != len(others):
+        return False
+    unmatched = list(others)
+    for token in tokens:
+        match = next((o for o in unmatched if _is_token_typo(token, o)), None)
+        if match is None:
+            return False
+        unmatched.remove(match)
+    return True
+
+
+@dataclass
+class CanonicalTool:
+    """Result of resolving a tool name"""
+    id: str
+    name: str
+    matched_by: str  # "alias" | "fuzzy" | "new"
+
+
+class _AliasTable:
+    """Signature -> canonical ID, with a trigram index over the signatures"""
+
+    def __init__(self):
+        self.aliases: Dict[str, str] = {}
+        self.display_names: Dict[str, str] = {}
+        self.trigrams: Dict[str, Set[str]] = {}
+        self.index: Dict[str, Set[str]] = defaultdict(set)
+        self.learned = 0
+
+    def add(self, signature: str, canonical_id: str, display_name: Optional[str] = None):
+        if signature in self.aliases:
+            return
+        self.aliases[signature] = canonical_id
+        if display_name and canonical_id not in self.display_names:
+            self.display_names[canonical_id] = display_name
+        grams = _trigrams(signature)
+        self.trigrams[signature] = grams
+        for gram in grams:
+            self.index[gram].add(signature)
+
+    def best_match(self, signature: str, threshold: float) -> Optional[Tuple[str, float]]:
+        """Most similar known typo variant of signature, among those at or above threshold"""
+        grams = _trigrams(signature)
+        shared = Counter()
+        for gram in grams:
+            for candidate in self.index.get(gram, ()):
+                shared[candidate] += 1
+        best = None
+        for candidate, common in shared.items():
+            # Upper bound of the Jaccard similarity, skips most candidates cheaply
+            if common / max(len(grams), len(self.trigrams[candidate])) < threshold:
+                continue
+            score = _similarity(grams, self.trigrams[candidate])
+            if score < threshold or not is_typo_variant(signature, candidate):
+                continue
+            if best is None or score > best[1]:
+                best = (candidate, score)
+        return best
+
+
+class ToolCanonicalizer:
+    """
+    Maps free-form tool names to canonical tool IDs.
+
+    The alias table is rebuilt from the `scans` history by refresh_from_scans():
+    names are grouped by signature, and groups within TOOL_ALIAS_SIMILARITY of a
+    more frequently scanned group are folded into it. A name that is not in the
+    table is matched to a typo-level variant, or becomes a new ID that later
+    lookups reuse.
+    """
+
+    def __init__(self, similarity: Optional[float] = None):
+        self.similarity = similarity or settings.tool_alias_similarity
+        self._table = _AliasTable()
+        self._memo: "OrderedDict[str, CanonicalTool]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memo_hits = 0
+        self.alias_hits = 0
+        self.fuzzy_hits = 0
+        self.new_names = 0
+        self.refreshed_at = None
+
+    @staticmethod
+    def _make_id(signature: str) -> str:
+        return signature.replace(" ", "-")
+
+    def resolve(self, tool_name: str) -> CanonicalTool:
+        """Canonical ID and display name for a tool name"""
+        raw = " ".join(tool_name.lower().split())
+        with self._lock:
+            memoized = self._memo.get(raw)
+            if memoized is not None:
+                self._memo.move_to_end(raw)
+                # Counted when first resolved, kept out of the hit rate
+                self.memo_hits += 1
+                return memoized
+
+            table = self._table
+            signature = tool_signature(tool_name)
+            if signature in table.aliases:
+                canonical_id = table.aliases[signature]
+                matched_by = "alias"
+            else:
+                match = table.best_match(signature, self.similarity) if signature else None
+                if match:
+                    canonical_id = table.aliases[match[0]]
+                    matched_by = "fuzzy"
+                    logger.info(f"Tool name '{tool_name}' matched '{match[0]}' ({match[1]:.2f})")
+                else:
+                    canonical_id = self._make_id(signature)
+                    matched_by = "new"
+                if table.learned < MAX_LEARNED_ALIASES:
+                    table.add(signature, canonical_id, tool_name.strip())
+                    table.learned += 1
+
+            resolved = CanonicalTool(
+                id=canonical_id,
+                name=table.display_names.get(canonical_id, tool_name.strip()),
+                matched_by=matched_by
+            )
+            self._memo[raw] = resolved
+            if len(self._memo) > RESOLVE_MEMO_SIZE:
+                self._memo.popitem(last=False)
+            self._count(matched_by)
+            return resolved
+
+    def canonical_id(self, tool_name: str) -> str:
+        return self.resolve(tool_name).id
+
+    def _count(self, matched_by: str):
+        if matched_by == "alias":
+            self.alias_hits += 1
+        elif matched_by == "fuzzy":
+            self.fuzzy_hits += 1
+        else:
+            self.new_names += 1
+
+    def build_table(self, tool_names: List[str]) -> _AliasTable:
+        """Alias table for a list of scanned names (one entry per scan)"""
+        counts = Counter()
+        spellings = defaultdict(Counter)
+        for name in tool_names:
+            signature = tool_signature(name)
+            if signature:
+                counts[signature] += 1
+                spellings[signature][name.strip()] += 1
+
+        table = _AliasTable()
+        # Most scanned first, so variants fold into the dominant spelling
+        for signature, _ in counts.most_common():
+            display_name = spellings[signature].most_common(1)[0][0]
+            match = table.best_match(signature, self.similarity)
+            canonical_id = table.aliases[match[0]] if match else self._make_id(signature)
+            table.add(signature, canonical_id, display_name)
+        return table
+
+    def refresh_from_scans(self, limit: Optional[int] = None):
+        """Rebuild the alias table from the most recent scans (blocking)"""
+        response = (
+            supabase.table("scans")
+            .select("tool_name")
+            .order("created_at", desc=True)
+            .limit(limit or settings.tool_alias_scan_sample)
+            .execute()
+        )
+        names = [row["tool_name"] for row in response.data or [] if row.get("tool_name")]
+        table = self.build_table(names)
+        with self._lock:
+            self._table = table
+            self._memo.clear()
+        self.refreshed_at = time.time()
+        logger.info(
+            f"Tool alias table rebuilt from {len(names)} scans: "
+            f"{len(table.aliases)} aliases, {len(set(table.aliases.values()))} tools"
+        )
+
+    async def refresh_periodically(self):
+        """Keep the alias table in sync with the scans history, run as a background task"""
+        while True:
+            try:
+                await asyncio.to_thread(self.refresh_from_scans)
+            except Exception as e:
+                logger.warning(f"Tool alias table refresh failed: {e}")
+            await asyncio.sleep(settings.tool_alias_refresh_seconds)
+
+    def stats(self) -> dict:
+        lookups = self.alias_hits + self.fuzzy_hits + self.new_names
+        table = self._table
+        return {
+            "name": "tool_names",
+            "memo_hits": self.memo_hits,
+            "alias_hits": self.alias_hits,
+            "fuzzy_hits": self.fuzzy_hits,
+            "new_names": self.new_names,
+            "hit_rate": round((self.alias_hits + self.fuzzy_hits) / lookups, 3) if lookups else 0.0,
+            "aliases": len(table.aliases),
+            "tools": len(set(table.aliases.values())),
+            "refreshed_at": self.refreshed_at,
+        }
+
+
+tool_canonicalizer = ToolCanonicalizer()
+
+
+def canonical_tool_id(tool_name: str) -> str:
+    """Canonical ID for a tool name, the key for caches and analytics"""
+    return tool_canonicalizer.canonical_id(tool_name)
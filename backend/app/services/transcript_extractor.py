@@ -0,0 +1,110 @@
+"""
+Relevance-ranked excerpts from YouTube transcripts.
+
+Instead of putting a whole transcript into the research results, timed segments
+are grouped into short windows, scored with BM25 against the tool name and the
+topics the manual covers, and only the best windows that fit in a character
+budget are kept. Every excerpt links to its timestamp in the video.
+"""
+
+from typing import List
+from app.config import settings
+from app.model.schemas import TranscriptExcerpt
+from app.services.text_ranking import tokenize, bm25_scores
+
+# Topics the manual sections ask about; tool-name terms are weighted higher
+SECTION_KEYWORDS = [
+    "use", "using", "step", "how", "safety", "safe", "danger", "warning", "glove", "goggle",
+    "protect", "hazard", "feature", "type", "size", "tip", "technique", "mistake", "avoid",
+    "wrong", "problem", "maintenance", "clean", "store", "storage", "sharpen", "oil",
+    "replace", "adjust", "hold", "grip", "blade", "bit", "battery", "setting",
+]
+TOOL_NAME_WEIGHT = 3.0
+
+# Target length of a window of consecutive segments
+WINDOW_SECONDS = 30.0
+
+
+def youtube_deep_link(video_id: str, seconds: float) -> str:
+    return f"https://www.youtube.com/watch?v={video_id}&t={int(seconds)}s"
+
+
+def _format_timestamp(seconds: float) -> str:
+    minutes, secs = divmod(int(seconds), 60)
+    return f"{minutes}:{secs:02d}"
+
+
+def _build_windows(video_id: str, segments: List[dict]) -> List[TranscriptExcerpt]:
+    windows = []
+    current = []
+    for segment in segments:
+        text = " ".join(segment.get("text", "").split())
+        if not text:
+            continue
+        current.append((segment.get("start", 0.0), segment.get("duration", 0.0), text))
+        if current[-1][0] + current[-1][1] - current[0][0] >= WINDOW_SECONDS:
+            windows.append(current)
+            current = []
+    if current:
+        windows.append(current)
+
+    return [
+        TranscriptExcerpt(
+            start=window[0][0],
+            end=window[-1][0] + window[-1][1],
+            text=" ".join(text for _, _, text in window),
+            url=youtube_deep_link(video_id, window[0][0])
+        )
+        for window in windows
+    ]
+
+
+def extract_relevant_excerpts(
+    video_id: str,
+    segments: List[dict],
+    tool_name: str,
+    char_budget: int = None
+) -> List[TranscriptExcerpt]:
+    """
+    Pick the transcript windows most relevant to the tool, within char_budget.
+
+    Args:
+        video_id: YouTube video ID, used for timestamp deep links
+        segments: Raw transcript segments ({'text', 'start', 'duration'})
+        tool_name: Tool the research is about
+        char_budget: Maximum total excerpt text, TRANSCRIPT_CHAR_BUDGET by default
+
+    Returns:
+        Selected excerpts in chronological order, each with its score and deep link
+    """
+    char_budget = char_budget or settings.transcript_char_budget
+    windows = _build_windows(video_id, segments)
+    if not windows:
+        return []
+
+    query = {term: 1.0 for term in tokenize(" ".join(SECTION_KEYWORDS))}
+    for term in tokenize(tool_name):
+        query[term] = TOOL_NAME_WEIGHT
+    scores = bm25_scores([tokenize(w.text) for w in windows], query)
+
+    ranked = sorted(zip(scores, range(len(windows))), key=lambda pair: -pair[0])
+    selected = []
+    used = 0
+    for score, index in ranked:
+        if score <= 0:
+            break
+        window = windows[index]
+        if used + len(window.text) > char_budget:
+            continue
+        window.score = round(score, 3)
+        selected.append(window)
+        used += len(window.text)
+
+    return sorted(selected, key=lambda w: w.start)
+
+
+def format_excerpts(excerpts: List[TranscriptExcerpt]) -> str:
+    """Plain-text rendering used as YouTubeLink.content"""
+    return "\n".join(
+        f"[{_format_timestamp(e.start)}] {e.text} ({e.url})" for e in excerpts
+    )
@@ -0,0 +1,153 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+from app.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Status of a stored transcript. Anything but "ok" is a negative entry.
+TRANSCRIPT_OK = "ok"
+TRANSCRIPT_DISABLED = "disabled"
+TRANSCRIPT_NOT_FOUND = "not_found"
+TRANSCRIPT_UNAVAILABLE = "unavailable"
+
+
+@dataclass
+class StoredTranscript:
+    """A transcript lookup result. segments is None for negative entries."""
+    video_id: str
+    language: str
+    status: str
+    segments: Optional[List[dict]] = None
+
+    @property
+    def available(self) -> bool:
+        return self.status == TRANSCRIPT_OK
+
+
+class TranscriptStore:
+    """
+    Local on-disk store of YouTube transcripts keyed by (video_id, language).
+
+    Keeps the raw segment list ({'text', 'start', 'duration'}) so callers can work
+    with timing, remembers videos without a usable transcript for NEGATIVE_TTL so
+    dead videos are not retried on every request, and evicts the least recently
+    used transcripts once the stored text exceeds max_bytes.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_bytes: Optional[int] = None, negative_ttl: Optional[int] = None):
+        self.path = path or os.path.join(settings.cache_dir, "transcripts.sqlite3")
+        self.max_bytes = max_bytes or settings.transcript_store_max_mb * 1024 * 1024
+        self.negative_ttl = negative_ttl or settings.transcript_negative_ttl
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS transcripts ("
+                "video_id TEXT NOT NULL, language TEXT NOT NULL, status TEXT NOT NULL, "
+                "segments TEXT, size INTEGER NOT NULL, stored_at REAL NOT NULL, last_access REAL NOT NULL, "
+                "PRIMARY KEY (video_id, language))"
+            )
+            self._conn.commit()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+    def get(self, video_id: str, language: str) -> Optional[StoredTranscript]:
+        """Stored transcript or negative entry, None when YouTube has to be asked."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, segments, stored_at FROM transcripts WHERE video_id = ? AND language = ?",
+                (video_id, language)
+            ).fetchone()
+            if row is not None:
+                status, segments, stored_at = row
+                if status != TRANSCRIPT_OK and now - stored_at > self.negative_ttl:
+                    # Transcripts do get added later, ask again
+                    row = None
+                else:
+                    self._conn.execute(
+                        "UPDATE transcripts SET last_access = ? WHERE video_id = ? AND language = ?",
+                        (now, video_id, language)
+                    )
+                    self._conn.commit()
+
+        if row is None:
+            self.misses += 1
+            return None
+        if status == TRANSCRIPT_OK:
+            self.hits += 1
+            return StoredTranscript(video_id, language, status, json.loads(segments))
+        self.negative_hits += 1
+        return StoredTranscript(video_id, language, status)
+
+    def put(self, video_id: str, language: str, segments: List[dict]):
+        data = json.dumps(segments)
+        self._write(video_id, language, TRANSCRIPT_OK, data, len(data.encode("utf-8")))
+        self._evict()
+
+    def put_negative(self, video_id: str, language: str, status: str):
+        self._write(video_id, language, status, None, 0)
+
+    def _write(self, video_id: str, language: str, status: str, segments: Optional[str], size: int):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO transcripts "
+                "(video_id, language, status, segments, size, stored_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (video_id, language, status, segments, size, now, now)
+            )
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop least recently used transcripts until the store fits in max_bytes."""
+        with self._lock:
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM transcripts").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            rows = self._conn.execute(
+                "SELECT video_id, language, size FROM transcripts WHERE size > 0 ORDER BY last_access ASC"
+            ).fetchall()
+            evicted = 0
+            for video_id, language, size in rows:
+                if total <= self.max_bytes:
+                    break
+                self._conn.execute(
+                    "DELETE FROM transcripts WHERE video_id = ? AND language = ?", (video_id, language)
+                )
+                total -= size
+                evicted += 1
+            self._conn.commit()
+        logger.info(f"Transcript store evicted {evicted} transcripts")
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, negative, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(status != 'ok'), 0), COALESCE(SUM(size), 0) FROM transcripts"
+            ).fetchone()
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            "name": "transcripts",
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            # Every hit, positive or negative, is a YouTube request we didn't make
+            "fetches_saved": self.hits + self.negative_hits,
+            "hit_rate": round((self.hits + self.negative_hits) / lookups, 3) if lookups else 0.0,
+            "entries": entries,
+            "negative_entries": negative,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+        }
+
+
+transcript_store = TranscriptStore()
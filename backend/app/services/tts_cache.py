@@ -0,0 +1,51 @@
+import hashlib
+from typing import Awaitable, Callable, Optional
+from app.config import settings
+from app.services.cache import TieredCache, SQLiteCacheStore
+from app.services.single_flight import tts_flight
+
+
+class TTSCache:
+    """
+    Cache of generated speech keyed on a hash of (provider, voice, cleaned text),
+    storing the public URL of the audio file. A hit makes TTS for repeated text
+    (regenerated messages, the same cached manual summary) free, and concurrent
+    misses for the same text share one synthesis.
+    """
+
+    def __init__(self):
+        self.cache = TieredCache(
+            name="tts",
+            max_size=settings.tts_cache_size,
+            ttl_seconds=settings.tts_cache_ttl,
+            store=SQLiteCacheStore("tts_cache")
+        )
+
+    @staticmethod
+    def make_key(cleaned_text: str, voice: str, provider: str) -> str:
+        return hashlib.sha256(f"{provider}|{voice}|{cleaned_text}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        return self.cache.get(key)
+
+    def set(self, key: str, audio_url: str):
+        self.cache.set(key, audio_url)
+
+    async def get_or_generate(self, key: str, generate: Callable[[], Awaitable[str]]) -> str:
+        """Cached audio URL for key, calling generate() once on a miss"""
+        audio_url = self.get(key)
+        if audio_url:
+            return audio_url
+
+        async def generate_and_store() -> str:
+            audio_url = await generate()
+            self.set(key, audio_url)
+            return audio_url
+
+        return await tts_flight.run(key, generate_and_store)
+
+    def stats(self) -> dict:
+        return self.cache.stats()
+
+
+tts_cache = TTSCache()
@@ -1,63 +1,164 @@
+import asyncio
+import hashlib
 from google import genai
-from PIL import Image
-import io
-from typing import Optional
+from google.genai import types
 from typing import Optional
 from app.config import settings, gemini_client
+from app.model.schemas import ImageAnalysis, ImageToolDetection
+from app.services.tool_canonicalizer import canonical_tool_id
+from app.services.image_preprocessing import image_preprocessor
+from app.services.recognition_cache import recognition_cache, image_fingerprint
+from app.services.single_flight import recognition_flight
 
 # Initialize Gemini Client
 client = gemini_client
 
 
-def recognize_tools_in_image(image_bytes: bytes) -> Optional[str]:
+def _vision_image(image_bytes: bytes, content_type: Optional[str] = None) -> types.Part:
+    """Preprocess an upload (orient, downscale, strip metadata) into a request part"""
+    image = image_preprocessor.preprocess(image_bytes, content_type)
+    return types.Part.from_bytes(data=image.data, mime_type=image.content_type)
+
+
+def analyze_image(image_bytes: bytes, content_type: Optional[str] = None) -> Optional[ImageAnalysis]:
     """
-    Recognizes a single tool in an image using the Gemini Vision API.
+    Recognizes a tool and describes the image in a single Gemini Vision call.
 
     Args:
         image_bytes: The bytes of the image to analyze.
+        content_type: The upload's content type, used if preprocessing fails.
 
     Returns:
-        The name of the tool found in the image, or None.
+        The tool name (or None), the model's confidence and a short description,
+        or None if an error occurs.
     """
     try:
-        image = Image.open(io.BytesIO(image_bytes))
+        image = _vision_image(image_bytes, content_type)
         prompt = (
-            "Analyze the image and identify any tool or object detected, closest to the camera. "
-            "Return the most specific name and type you can. No commas, one name!"
-            "Return only the specific name and type, nothing else. "
-            "If no tool or object is found, return nothing"
+            "Analyze the image. If it shows a tool or object, set tool_name to the most specific "
+            "name and type of the one closest to the camera: one name, no commas. "
+            "If there is no tool or object, set tool_name to null. "
+            "Set confidence between 0 and 1 for how sure you are about tool_name. "
+            "Set description to a concise but detailed description of what you see."
         )
         response = client.models.generate_content(
             model=settings.gemini_model,
-            contents=[prompt, image]
+            contents=[prompt, image],
+            config=types.GenerateContentConfig(
+                response_mime_type="application/json",
+                response_schema=ImageAnalysis,
+            )
         )
-        
-        tool_name = response.text.strip()
-        return tool_name if tool_name else None
+
+        analysis = response.parsed
+        if not isinstance(analysis, ImageAnalysis):
+            analysis = ImageAnalysis.model_validate_json(response.text)
+        analysis.tool_name = (analysis.tool_name or "").strip() or None
+        analysis.description = analysis.description.strip()
+        return analysis
     except Exception as e:
-        print(f"An error occurred during tool recognition: {e}")
+        print(f"An error occurred during image analysis: {e}")
+        return None
+
+
+async def aanalyze_image(image_bytes: bytes, content_type: Optional[str] = None) -> Optional[ImageAnalysis]:
+    """
+    Async variant of analyze_image. Runs preprocessing and the blocking Gemini
+    call in a worker thread, and concurrent requests with the identical image
+    share one call. Images that look like a recently recognized one (by
+    perceptual hash) reuse its result without calling the model.
+    """
+    fingerprint = await asyncio.to_thread(image_fingerprint, image_bytes)
+    if fingerprint is not None:
+        cached = recognition_cache.get(fingerprint)
+        if cached:
+            return ImageAnalysis.model_validate(cached)
+
+    key = hashlib.sha256(image_bytes).hexdigest()
+    analysis = await recognition_flight.run(
+        key, lambda: asyncio.to_thread(analyze_image, image_bytes, content_type)
+    )
+    # Only confident recognitions are remembered: a failed call, no tool or a
+    # low-confidence name would otherwise be served again on every retry
+    if confident_tool_name(analysis) and fingerprint is not None:
+        recognition_cache.set(fingerprint, analysis.model_dump())
+    return analysis
+
+
+def confident_tool_name(analysis: Optional[ImageAnalysis]) -> Optional[str]:
+    """The analysed tool name, unless the model was below VISION_MIN_CONFIDENCE"""
+    if analysis is None or not analysis.tool_name:
+        return None
+    if analysis.confidence < settings.vision_min_confidence:
         return None
+    return analysis.tool_name
 
-def describe_image(image_bytes: bytes) -> Optional[str]:
+def detect_tools_in_image(image_bytes: bytes, content_type: Optional[str] = None) -> Optional[ImageToolDetection]:
     """
-    Describes the contents of an image using the Gemini Vision API.
+    Detects every tool in an image (a toolbox, a workbench) in one Gemini Vision call.
 
     Args:
         image_bytes: The bytes of the image to analyze.
+        content_type: The upload's content type, used if preprocessing fails.
 
     Returns:
-        A text description of the image, or None if an error occurs.
+        The detected tools with confidences and bounding boxes, and a short
+        description of the image, or None if an error occurs.
     """
     try:
-        image = Image.open(io.BytesIO(image_bytes))
-        prompt = "Describe what you see in this image in a concise but detailed way."
+        image = _vision_image(image_bytes, content_type)
+        prompt = (
+            "Analyze the image and list every distinct tool in it, most prominent first. "
+            "For each tool give the most specific name and type you can (one name, no commas), "
+            "a confidence between 0 and 1, and its bounding box as [ymin, xmin, ymax, xmax] "
+            "normalized to 0-1000. List a tool once even if it appears several times. "
+            "If there are no tools, return an empty list. "
+            "Also give a concise description of what you see."
+        )
         response = client.models.generate_content(
             model=settings.gemini_model,
-            contents=[prompt, image]
+            contents=[prompt, image],
+            config=types.GenerateContentConfig(
+                response_mime_type="application/json",
+                response_schema=ImageToolDetection,
+            )
         )
-        
-        description = response.text.strip()
-        return description if description else None
+
+        detection = response.parsed
+        if not isinstance(detection, ImageToolDetection):
+            detection = ImageToolDetection.model_validate_json(response.text)
+        return detection
     except Exception as e:
-        print(f"An error occurred during image description: {e}")
+        print(f"An error occurred during multi-tool detection: {e}")
         return None
+
+
+async def adetect_tools_in_image(image_bytes: bytes, content_type: Optional[str] = None) -> Optional[ImageToolDetection]:
+    """
+    Async variant of detect_tools_in_image. Drops tools below VISION_MIN_CONFIDENCE
+    and repeats of the same canonical tool, and keeps at most MULTI_TOOL_MAX_TOOLS.
+    Concurrent requests with the identical image share one call.
+    """
+    key = "multi|" + hashlib.sha256(image_bytes).hexdigest()
+    detection = await recognition_flight.run(
+        key, lambda: asyncio.to_thread(detect_tools_in_image, image_bytes, content_type)
+    )
+    if detection is None:
+        return None
+
+    tools, seen = [], set()
+    for tool in detection.tools:
+        name = tool.name.strip()
+        if not name or tool.confidence < settings.vision_min_confidence:
+            continue
+        canonical_id = canonical_tool_id(name)
+        if canonical_id in seen:
+            continue
+        seen.add(canonical_id)
+        if tool.box is not None and len(tool.box) != 4:
+            tool.box = None
+        tools.append(tool.model_copy(update={"name": name}))
+    return ImageToolDetection(
+        tools=tools[:settings.multi_tool_max_tools],
+        description=detection.description.strip()
+    )
@@ -0,0 +1,7 @@
+-- Manuals are saved once per language, all rows linked to the same scan.
+-- Translations record the language they were translated from, so they can be
+-- told apart from the primary manual (the knowledge index skips them).
+-- Run in the Supabase SQL editor before deploying the backend that writes it.
+ALTER TABLE public.manuals
+    ADD COLUMN IF NOT EXISTS language TEXT NOT NULL DEFAULT 'en',
+    ADD COLUMN IF NOT EXISTS translated_from TEXT;
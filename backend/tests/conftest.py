@@ -0,0 +1,13 @@
+import os
+import sys
+import tempfile
+
+# app.config reads these at import time; unit tests never reach the real services
+os.environ.setdefault("GOOGLE_API_KEYS", "test-key")
+os.environ.setdefault("TAVILY_API_KEY", "test-key")
+os.environ.setdefault("SUPABASE_URL", "https://test.supabase.co")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoic2VydmljZSJ9.test")
+os.environ.setdefault("SUPABASE_ANON_KEY", "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.test")
+os.environ.setdefault("CACHE_DIR", tempfile.mkdtemp(prefix="toolify-test-cache-"))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,36 @@
+from app.services.knowledge_index import KnowledgeIndex, RESEARCH_KINDS
+
+
+def _research(*contents):
+    return {"research_results": [
+        {"title": f"Result {i}", "url": f"https://example.com/{i}", "content": content}
+        for i, content in enumerate(contents)
+    ]}
+
+
+def test_manual_pipeline_ignores_stored_manuals(tmp_path):
+    index = KnowledgeIndex(str(tmp_path / "knowledge.sqlite3"))
+    index.add_manual("Claw Hammer", "## Safety\nWear goggles.\n\n## Maintenance\nKeep the head tight.")
+    assert index.search("claw hammer", "safety maintenance").passages
+    assert not index.search("claw hammer", "safety maintenance", kinds=RESEARCH_KINDS).passages
+
+    index.add_research("Claw Hammer", _research("Hammer safety: wear goggles and check the handle."))
+    passages = index.search("claw hammer", "safety", kinds=RESEARCH_KINDS).passages
+    assert [p.kind for p in passages] == ["web"]
+
+
+def test_oldest_passages_are_dropped_beyond_the_cap(tmp_path):
+    path = str(tmp_path / "knowledge.sqlite3")
+    index = KnowledgeIndex(path, max_passages=2)
+    index.add_research("Claw Hammer", _research("claw hammer pulls nails"))
+    index.add_research("Tape Measure", _research("tape measure reads lengths"))
+    index.add_research("Hand Saw", _research("hand saw cuts wood"))
+
+    assert index.stats()["passages"] == 2
+    assert not index.search("claw hammer", "nails").passages
+    assert index.search("hand saw", "wood").passages
+
+    reloaded = KnowledgeIndex(path, max_passages=2)
+    assert reloaded.stats()["passages"] == 2
+    assert not reloaded.search("claw hammer", "nails").passages
+    assert reloaded.search("tape measure", "lengths").passages
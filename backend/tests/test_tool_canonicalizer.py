@@ -0,0 +1,84 @@
+import pytest
+from app.services.tool_canonicalizer import ToolCanonicalizer, is_typo_variant, tool_signature
+
+
+@pytest.mark.parametrize("name, other", [
+    ("Milwaukee M18 Cordless Hammer Drill", "Milwaukee M18 Cordless Drill"),
+    ("M18 drill", "M12 drill"),
+    ("hand saw", "band saw"),
+    ("torque wrench", "torx wrench"),
+    ("impact driver", "impact wrench"),
+    ("circular saw", "circular saw blade"),
+])
+def test_different_tools_are_not_typo_variants(name, other):
+    assert not is_typo_variant(tool_signature(name), tool_signature(other))
+
+
+@pytest.mark.parametrize("name, other", [
+    ("claw hamer", "claw hammer"),
+    ("Philips screwdriver", "Phillips screwdriver"),
+    ("adjustible wrench", "adjustable wrench"),
+    ("angle grindr", "angle grinder"),
+])
+def test_misspellings_are_typo_variants(name, other):
+    assert is_typo_variant(tool_signature(name), tool_signature(other))
+
+
+def test_signature_ignores_sizes_order_and_plurals():
+    assert tool_signature("16 oz Claw Hammer") == tool_signature("Hammers (claw)")
+
+
+def test_near_miss_names_get_their_own_id():
+    canonicalizer = ToolCanonicalizer()
+    canonicalizer._table = canonicalizer.build_table(
+        ["Milwaukee M18 Cordless Drill"] * 3 + ["Claw Hammer"] * 2
+    )
+
+    drill = canonicalizer.resolve("Milwaukee M18 Cordless Drill")
+    hammer_drill = canonicalizer.resolve("Milwaukee M18 Cordless Hammer Drill")
+    assert hammer_drill.id != drill.id
+    assert hammer_drill.matched_by == "new"
+
+    typo = canonicalizer.resolve("claw hamer")
+    assert typo.matched_by == "fuzzy"
+    assert typo.id == canonicalizer.canonical_id("Claw Hammer")
+
+
+def test_build_table_keeps_near_miss_groups_apart():
+    canonicalizer = ToolCanonicalizer()
+    table = canonicalizer.build_table([
+        "Milwaukee M18 Cordless Drill",
+        "Milwaukee M18 Cordless Drill",
+        "Milwaukee M18 Cordless Hammer Drill",
+        "Milwuakee M18 Cordless Drill",
+    ])
+    drill = table.aliases[tool_signature("Milwaukee M18 Cordless Drill")]
+    assert table.aliases[tool_signature("Milwaukee M18 Cordless Hammer Drill")] != drill
+    assert table.aliases[tool_signature("Milwuakee M18 Cordless Drill")] == drill
+
+
+@pytest.mark.parametrize("name, other", [
+    ("3M 6200", "3M 7502"),
+    ("Dremel 3000", "Dremel 4000"),
+    ("5-in-1", "18V"),
+    ("18V", "20V"),
+])
+def test_model_numbers_and_bare_sizes_get_their_own_id(name, other):
+    canonicalizer = ToolCanonicalizer()
+    name_id, other_id = canonicalizer.canonical_id(name), canonicalizer.canonical_id(other)
+    assert name_id and other_id
+    assert name_id != other_id
+
+
+def test_counts_are_not_model_numbers():
+    assert tool_signature("2 claw hammers") == tool_signature("Claw Hammer")
+
+
+def test_memo_hits_are_kept_out_of_the_hit_rate():
+    canonicalizer = ToolCanonicalizer()
+    canonicalizer.canonical_id("Claw Hammer")
+    canonicalizer.canonical_id("Claw Hammer")
+    stats = canonicalizer.stats()
+    assert stats["memo_hits"] == 1
+    assert stats["alias_hits"] == 0
+    assert stats["hit_rate"] == 0.0
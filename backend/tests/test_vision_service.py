@@ -0,0 +1,43 @@
+import asyncio
+import pytest
+from app.model.schemas import ImageAnalysis
+from app.services import vision_service
+from app.services.recognition_cache import RecognitionCache
+
+
+@pytest.fixture
+def recognition(monkeypatch):
+    cache = RecognitionCache(max_size=16, ttl_seconds=60, max_distance=0)
+    calls = []
+
+    def analyze(result):
+        def fake_analyze_image(image_bytes, content_type=None):
+            calls.append(image_bytes)
+            return result
+        monkeypatch.setattr(vision_service, "analyze_image", fake_analyze_image)
+        return asyncio.run(vision_service.aanalyze_image(b"photo"))
+
+    monkeypatch.setattr(vision_service, "recognition_cache", cache)
+    monkeypatch.setattr(vision_service, "image_fingerprint", lambda image_bytes: 42)
+    return analyze, calls
+
+
+@pytest.mark.parametrize("failed", [
+    None,
+    ImageAnalysis(tool_name=None, confidence=0.0, description="a desk"),
+    ImageAnalysis(tool_name="Claw Hammer", confidence=0.1, description="a blurry hammer"),
+])
+def test_failed_recognition_is_retried(recognition, failed):
+    analyze, calls = recognition
+    analyze(failed)
+    confident = ImageAnalysis(tool_name="Claw Hammer", confidence=0.95, description="a hammer")
+    assert analyze(confident) == confident
+    assert len(calls) == 2
+
+
+def test_confident_recognition_is_cached(recognition):
+    analyze, calls = recognition
+    confident = ImageAnalysis(tool_name="Claw Hammer", confidence=0.95, description="a hammer")
+    analyze(confident)
+    assert analyze(None) == confident
+    assert len(calls) == 1